@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fbutil.tools.fbplay import main  # noqa: E402
+
+if __name__ == "__main__":
+    main()
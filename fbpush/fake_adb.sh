@@ -0,0 +1,28 @@
+#!/bin/sh
+# Stand-in for adb that uses a local folder as the device's file system, to
+# try fbpush without a device:
+#   fbpush --adb ./fake_adb.sh <frames> /sdcard/frames
+# FAKE_ADB_ROOT sets the folder (default: /tmp/fake_device) and
+# FAKE_ADB_FAIL the percentage of pushes that fail, to exercise retries.
+ROOT=${FAKE_ADB_ROOT:-/tmp/fake_device}
+if [ "$1" = "-s" ]; then
+    shift 2
+fi
+case "$1" in
+push)
+    if [ "$(od -An -N1 -tu1 /dev/urandom)" -lt $((${FAKE_ADB_FAIL:-0} * 256 / 100)) ]; then
+        echo "adb: error: failed to copy '$2' (simulated)" >&2
+        exit 1
+    fi
+    mkdir -p "$ROOT$(dirname "$3")" && cp "$2" "$ROOT$3" && echo "$2: 1 file pushed."
+    ;;
+shell)
+    shift
+    mkdir -p "$ROOT"
+    cd "$ROOT" && echo "$*" | sed "s# /# $ROOT/#g" | sh
+    ;;
+*)
+    echo "fake_adb.sh: unsupported command: $1" >&2
+    exit 1
+    ;;
+esac
@@ -0,0 +1,33 @@
+import importlib
+
+# Converters that can be called in-process, e.g.
+#   import fbutil
+#   fbutil.png_to_framebuffer("logo.png", "logo.bin", 1080, 2400)
+# Each is imported from its tool module the first time it is used, so
+# `import fbutil` stays cheap.
+API = {
+    "png_to_framebuffer": "img2fb",
+    "text_to_framebuffer": "txt2fb",
+    "TextOverlay": "txt2fb",
+    "video_to_framebuffer": "vid2fb",
+    "convert_frame": "vid2fb",
+    "framebuffer_to_png": "fb2img",
+    "record_framebuffer": "fb2img",
+    "mirror_framebuffer": "fb2img",
+    "fill_framebuffer": "fbfill",
+    "play": "fbplay",
+    "play_stream": "fbplay",
+    "compose_scene": "fbscene",
+    "push_frames": "fbpush",
+    "view_mirror": "fbview",
+}
+
+__all__ = list(API)
+
+
+def __getattr__(name):
+    if name not in API:
+        raise AttributeError(f"module 'fbutil' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"fbutil.tools.{API[name]}"), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,111 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Written to the output folder, maps each output file to the cache key of the
+# input and settings it was produced from
+MANIFEST_NAME = ".fbutil-cache.json"
+
+
+def expand_inputs(pattern, extensions=None):
+    # A directory (optionally filtered by extension), a glob, or a single file
+    if os.path.isdir(pattern):
+        paths = [
+            os.path.join(pattern, name)
+            for name in os.listdir(pattern)
+            if os.path.isfile(os.path.join(pattern, name))
+        ]
+        if extensions:
+            paths = [p for p in paths if os.path.splitext(p)[1].lower() in extensions]
+    else:
+        paths = glob.glob(pattern) if glob.has_magic(pattern) else [pattern]
+    return sorted(p for p in paths if not os.path.basename(p).startswith("."))
+
+
+def cache_key(input_path, params):
+    digest = hashlib.sha256()
+    with open(input_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def load_manifest(output_folder):
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(output_folder, manifest):
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def run_batch(inputs, output_folder, extension, convert, params, workers=None):
+    # Converts every input with convert(input_path, output_path, **params) on a
+    # process pool. Outputs whose input content and params are unchanged since
+    # the last run are skipped.
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = load_manifest(output_folder)
+
+    jobs = {}
+    skipped = 0
+    for input_path in inputs:
+        name = os.path.splitext(os.path.basename(input_path))[0] + extension
+        if name in jobs:
+            raise ValueError(f"{input_path} and {jobs[name][0]} both convert to {name}")
+        output_path = os.path.join(output_folder, name)
+        key = cache_key(input_path, params)
+        if manifest.get(name) == key and os.path.exists(output_path):
+            skipped += 1
+            continue
+        jobs[name] = (input_path, output_path, key)
+
+    start = time.perf_counter()
+    converted = failed = 0
+    bytes_in = bytes_out = 0
+    if jobs:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = {
+                pool.submit(convert, input_path, output_path, **params): name
+                for name, (input_path, output_path, _) in jobs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                input_path, output_path, key = jobs[name]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Failed to convert {input_path}: {e}")
+                    manifest.pop(name, None)
+                    failed += 1
+                    continue
+                manifest[name] = key
+                converted += 1
+                bytes_in += os.path.getsize(input_path)
+                bytes_out += os.path.getsize(output_path)
+        save_manifest(output_folder, manifest)
+    elapsed = time.perf_counter() - start
+
+    rate = converted / elapsed if elapsed else 0
+    throughput = (bytes_in + bytes_out) / elapsed / 1e6 if elapsed else 0
+    print(
+        f"Converted {converted} files ({failed} failed, {skipped} unchanged) in {elapsed:.2f}s: "
+        f"{rate:.1f} files/s, {throughput:.1f} MB/s read and written"
+    )
+    return {
+        "converted": converted,
+        "failed": failed,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "files_per_second": rate,
+        "mb_per_second": throughput,
+    }
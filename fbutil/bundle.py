@@ -0,0 +1,186 @@
+import gzip
+import io
+import os
+import tarfile
+import time
+import zlib
+
+import numpy as np
+
+from .timing import stats
+
+# Bundle layouts, picked from the file name:
+#   .tar.gz / .tgz  tar of 0.bin, 1.bin, ... like a vid2fb frame folder;
+#                   unpacked on the device with `tar xzf`
+#   .gz             raw frames back to back, compressed in independent gzip
+#                   members of chunk_frames frames each. `zcat` decompresses
+#                   the whole file as one stream, and the .idx file next to
+#                   it lists every member so a single chunk can be
+#                   decompressed straight into the framebuffer.
+TAR_EXTENSIONS = (".tar.gz", ".tgz")
+INDEX_SUFFIX = ".idx"
+INDEX_HEADER = "# fbutil bundle frame_size={frame_size} chunk_frames={chunk_frames}"
+
+# Typical adb push throughput over USB 2.0, in MB/s
+DEFAULT_LINK_SPEED = 30.0
+
+
+def is_tar_bundle(path):
+    return path.lower().endswith(TAR_EXTENSIONS)
+
+
+def is_bundle(path):
+    return is_tar_bundle(path) or path.lower().endswith(".gz")
+
+
+class BundleWriter:
+    # Compresses frames into a bundle as they are written, in call order
+    def __init__(self, path, level=6, chunk_frames=1):
+        if not is_bundle(path):
+            raise ValueError(f"{path} is not a bundle name, use .tar.gz, .tgz or .gz")
+        self.path = path
+        self.level = level
+        self.chunk_frames = chunk_frames
+        self.frames = 0
+        self.raw_bytes = 0
+        self.frame_size = None
+        if is_tar_bundle(path):
+            self._tar = tarfile.open(path, "w:gz", compresslevel=level)
+        else:
+            self._tar = None
+            self._file = open(path, "wb")
+            self._compressor = None
+            self._chunk = None
+            self.index = []
+
+    def write_frame(self, data):
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data).reshape(-1)
+        data = memoryview(data).cast("B")
+        if self.frame_size is None:
+            self.frame_size = len(data)
+        elif len(data) != self.frame_size:
+            raise ValueError(
+                f"Frame {self.frames} holds {len(data)} bytes, expected {self.frame_size}"
+            )
+
+        if self._tar is not None:
+            info = tarfile.TarInfo(f"{self.frames}.bin")
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._tar.addfile(info, io.BytesIO(data))
+        else:
+            if self._compressor is None:
+                # wbits 31 writes a gzip header and trailer around the deflate
+                # stream, so every chunk is a complete gzip member
+                self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+                self._chunk = [self._file.tell(), self.frames, 0]
+            self._file.write(self._compressor.compress(data))
+            self._chunk[2] += 1
+            if self.chunk_frames and self._chunk[2] >= self.chunk_frames:
+                self._end_chunk()
+
+        self.frames += 1
+        self.raw_bytes += len(data)
+
+    def _end_chunk(self):
+        self._file.write(self._compressor.flush())
+        offset, first_frame, frames = self._chunk
+        self.index.append((offset, self._file.tell() - offset, first_frame, frames))
+        self._compressor = None
+
+    def close(self):
+        if self._tar is not None:
+            if not self._tar.closed:
+                self._tar.close()
+        elif not self._file.closed:
+            if self._compressor is not None:
+                self._end_chunk()
+            self._file.close()
+            with open(self.path + INDEX_SUFFIX, "w") as f:
+                f.write(
+                    INDEX_HEADER.format(
+                        frame_size=self.frame_size or 0,
+                        chunk_frames=self.chunk_frames,
+                    )
+                    + "\n"
+                )
+                for offset, length, first_frame, frames in self.index:
+                    f.write(f"{offset} {length} {first_frame} {frames}\n")
+        stats.count("bytes_written", self.compressed_bytes)
+
+    @property
+    def compressed_bytes(self):
+        return os.path.getsize(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_index(path):
+    # Returns (frame_size, [(offset, length, first_frame, frames), ...]) from
+    # the .idx file of a .gz bundle
+    frame_size = None
+    chunks = []
+    with open(path + INDEX_SUFFIX) as f:
+        for line in f:
+            if line.startswith("#"):
+                for field in line.split():
+                    if field.startswith("frame_size="):
+                        frame_size = int(field.split("=", 1)[1])
+            elif line.strip():
+                chunks.append(tuple(int(v) for v in line.split()))
+    if frame_size is None:
+        raise ValueError(f"{path}{INDEX_SUFFIX} does not record the frame size")
+    return frame_size, chunks
+
+
+def read_bundle(path, frame_size=None):
+    # Yields the frames of a bundle as bytes, in order
+    if is_tar_bundle(path):
+        with tarfile.open(path, "r:gz") as tar:
+            members = [m for m in tar.getmembers() if m.name.endswith(".bin")]
+            members.sort(key=lambda m: int(os.path.basename(m.name)[:-4]))
+            for member in members:
+                yield tar.extractfile(member).read()
+        return
+
+    if frame_size is None:
+        frame_size = read_index(path)[0]
+    with gzip.open(path, "rb") as f:
+        while True:
+            frame = f.read(frame_size)
+            if not frame:
+                break
+            if len(frame) < frame_size:
+                raise ValueError(
+                    f"{path} ends in the middle of a frame ({len(frame)} of {frame_size} bytes)"
+                )
+            yield frame
+
+
+def bundle_report(raw_bytes, compressed_bytes, frames, elapsed, link_speed):
+    # Prints the compression ratio and how long pushing the bundle would take
+    # compared to the uncompressed frames
+    ratio = raw_bytes / compressed_bytes if compressed_bytes else 0
+    raw_push = raw_bytes / (link_speed * 1e6)
+    push = compressed_bytes / (link_speed * 1e6)
+    print(
+        f"Bundled {frames} frames: {raw_bytes / 1e6:.1f} MB -> {compressed_bytes / 1e6:.1f} MB "
+        f"({ratio:.1f}x) in {elapsed:.2f}s"
+    )
+    print(
+        f"Estimated push at {link_speed:g} MB/s: {push:.1f}s instead of {raw_push:.1f}s "
+        f"(saves {raw_push - push:.1f}s, plus decompression on the device)"
+    )
+    return {
+        "frames": frames,
+        "raw_bytes": raw_bytes,
+        "compressed_bytes": compressed_bytes,
+        "ratio": ratio,
+        "push_seconds": push,
+        "raw_push_seconds": raw_push,
+    }
@@ -0,0 +1,54 @@
+import importlib
+import sys
+
+# Subcommands and their one-line descriptions. Each lives in fbutil.tools and
+# is only imported when it runs, so NumPy, Pillow and OpenCV are loaded by
+# the commands that use them and not by fbinfo or --help.
+COMMANDS = {
+    "img2fb": "Convert an image to a framebuffer",
+    "txt2fb": "Render text to a framebuffer",
+    "vid2fb": "Convert each frame of a video to framebuffers",
+    "fb2img": "Convert a framebuffer to a PNG image or record it",
+    "fbfill": "Fill a framebuffer with a solid color",
+    "fbinfo": "Show the device's framebuffer information",
+    "fbplay": "Play vid2fb output on a framebuffer",
+    "fbscene": "Composite fills, images and text into one framebuffer",
+    "fbbundle": "Compress vid2fb output for pushing to a device",
+    "fbpush": "Push vid2fb output to a device, resuming where it stopped",
+    "fbview": "View a screen mirrored by fb2img --mirror",
+    "fbbench": "Benchmark the converters",
+}
+
+
+def usage():
+    lines = ["usage: fbutil <command> [arguments]", "", "commands:"]
+    lines.extend(f"  {name:<10} {help}" for name, help in COMMANDS.items())
+    lines.append("")
+    lines.append("Run fbutil <command> --help for the arguments of a command.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    # Runs one subcommand. argv defaults to the command line; scripts can call
+    # main(["img2fb", ...]) repeatedly from one warm process.
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"fbutil: unknown command {command!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    module = importlib.import_module(f"fbutil.tools.{command}")
+    try:
+        module.main(args, prog=f"fbutil {command}")
+    finally:
+        # Leave the process as the command found it for the next one: its
+        # statistics written and stdout no longer reserved for frame data
+        timing = sys.modules.get("fbutil.timing")
+        if timing is not None:
+            timing.end_stats()
+        stream = sys.modules.get("fbutil.stream")
+        if stream is not None:
+            stream.restore_stdout()
+    return 0
@@ -0,0 +1,179 @@
+import mmap
+import struct
+
+import numpy as np
+
+from .delta import apply_delta, is_keyframe
+from .timing import stats
+
+# Packed frame container:
+#   header (HEADER struct, padded to ALIGNMENT)
+#   frame payloads, each starting on an ALIGNMENT boundary (packed back to
+#   back for delta containers)
+#   index of (offset, length) pairs, one per frame, at index_offset
+# The header is rewritten on close once the frame count and index offset are
+# known, so frames can be appended as they are produced. With FLAG_DELTA set,
+# payloads are fbutil.delta tile deltas against the previous frame.
+MAGIC = b"FBPK"
+VERSION = 1
+FLAG_DELTA = 1
+ALIGNMENT = 4096
+HEADER = struct.Struct("<4sHHIII16sdQQ")
+INDEX_ENTRY = struct.Struct("<QQ")
+
+
+def align(offset, alignment=ALIGNMENT):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def is_container(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class FrameContainerWriter:
+    def __init__(self, path, width, height, stride, format, fps=0.0, flags=0):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.stride = stride
+        self.format = format
+        self.fps = fps
+        self.flags = flags
+        self.index = []
+        self._file = open(path, "wb")
+        self._offset = align(HEADER.size)
+        self._write_header(0)
+
+    def _write_header(self, index_offset):
+        self._file.seek(0)
+        self._file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                self.flags,
+                self.width,
+                self.height,
+                self.stride,
+                self.format.encode(),
+                self.fps,
+                len(self.index),
+                index_offset,
+            )
+        )
+
+    def write_frame(self, data):
+        # Accepts bytes or a NumPy array; frames are stored in call order
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data).reshape(-1)
+        data = memoryview(data).cast("B")
+        self._file.seek(self._offset)
+        self._file.write(data)
+        stats.count("bytes_written", len(data))
+        self.index.append((self._offset, len(data)))
+        self._offset += len(data)
+        if not self.flags & FLAG_DELTA:
+            # Full frames start on a page boundary so they can be mapped or
+            # copied with page-sized positioned reads; deltas are packed
+            self._offset = align(self._offset)
+        return len(self.index) - 1
+
+    def share_frame(self, frame_index):
+        # Adds a frame identical to an earlier one by pointing its index entry
+        # at that frame's payload instead of storing it again
+        self.index.append(self.index[frame_index])
+        return len(self.index) - 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(self._offset)
+        for offset, length in self.index:
+            self._file.write(INDEX_ENTRY.pack(offset, length))
+        self._write_header(self._offset)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameContainer:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.flags,
+            self.width,
+            self.height,
+            self.stride,
+            format,
+            self.fps,
+            frame_count,
+            index_offset,
+        ) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a frame container")
+        if version != VERSION:
+            self._mm.close()
+            raise ValueError(f"Unsupported frame container version: {version}")
+        self.format = format.rstrip(b"\0").decode()
+        self.index = np.frombuffer(
+            self._mm, dtype="<u8", count=frame_count * 2, offset=index_offset
+        ).reshape((frame_count, 2))
+
+    def __len__(self):
+        return len(self.index)
+
+    def frame(self, frame_index):
+        # Zero-copy view of one frame's bytes
+        offset, length = self.index[frame_index]
+        return np.frombuffer(self._mm, dtype=np.uint8, count=length, offset=offset)
+
+    @property
+    def delta(self):
+        return bool(self.flags & FLAG_DELTA)
+
+    def render(self, frame_index, out=None):
+        # Returns the full (height, stride) frame. Delta containers are replayed
+        # from the closest keyframe at or before frame_index.
+        if not self.delta:
+            frame = self.frame(frame_index).reshape((self.height, self.stride))
+            if out is None:
+                return frame
+            out[:] = frame
+            return out
+
+        if out is None:
+            out = np.zeros((self.height, self.stride), dtype=np.uint8)
+        start = frame_index
+        while start > 0 and not is_keyframe(
+            self.frame(start), self.height, self.stride
+        ):
+            start -= 1
+        for i in range(start, frame_index + 1):
+            apply_delta(self.frame(i), out)
+        return out
+
+    def __iter__(self):
+        for frame_index in range(len(self)):
+            yield self.frame(frame_index)
+
+    def close(self):
+        self.index = None
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,77 @@
+import struct
+
+import numpy as np
+
+# A delta payload is a tile count followed by that many tiles, each a TILE
+# header (first row, first byte in the row, rows, bytes per row) and the tile's
+# bytes row by row. A keyframe is a delta holding the whole frame as one tile.
+COUNT = struct.Struct("<I")
+TILE = struct.Struct("<IIII")
+
+
+def dirty_tiles(prev, curr, tile_rows=32, tile_bytes=128):
+    # Compares two (height, stride) uint8 frames in tile_rows x tile_bytes
+    # tiles and returns (row, col, rows, cols) byte rectangles for the changed
+    # ones, with neighbouring dirty tiles in a tile row merged into one run
+    height, stride = curr.shape
+    row_starts = np.arange(0, height, tile_rows)
+    col_starts = np.arange(0, stride, tile_bytes)
+    changed = np.not_equal(prev, curr)
+    changed = np.logical_or.reduceat(changed, row_starts, axis=0)
+    changed = np.logical_or.reduceat(changed, col_starts, axis=1)
+
+    tiles = []
+    for ty, tx in zip(*np.nonzero(changed)):
+        row = int(row_starts[ty])
+        col = int(col_starts[tx])
+        rows = min(tile_rows, height - row)
+        cols = min(tile_bytes, stride - col)
+        if tiles and tiles[-1][0] == row and tiles[-1][1] + tiles[-1][3] == col:
+            tiles[-1] = (row, tiles[-1][1], rows, tiles[-1][3] + cols)
+        else:
+            tiles.append((row, col, rows, cols))
+    return tiles
+
+
+def encode_delta(prev, curr, tile_rows=32, tile_bytes=128):
+    # Encodes curr against prev. Pass prev=None to produce a keyframe.
+    height, stride = curr.shape
+    if prev is None:
+        tiles = [(0, 0, height, stride)]
+    else:
+        tiles = dirty_tiles(prev, curr, tile_rows, tile_bytes)
+
+    parts = [COUNT.pack(len(tiles))]
+    for row, col, rows, cols in tiles:
+        parts.append(TILE.pack(row, col, rows, cols))
+        parts.append(curr[row : row + rows, col : col + cols].tobytes())
+    return b"".join(parts)
+
+
+def iter_tiles(payload):
+    # Yields (row, col, rows, cols, data) for every tile in a delta payload
+    payload = memoryview(payload).cast("B")
+    (count,) = COUNT.unpack_from(payload, 0)
+    offset = COUNT.size
+    for _ in range(count):
+        row, col, rows, cols = TILE.unpack_from(payload, offset)
+        offset += TILE.size
+        yield row, col, rows, cols, payload[offset : offset + rows * cols]
+        offset += rows * cols
+
+
+def is_keyframe(payload, height, stride):
+    (count,) = COUNT.unpack_from(payload, 0)
+    if count != 1:
+        return False
+    return TILE.unpack_from(payload, COUNT.size) == (0, 0, height, stride)
+
+
+def apply_delta(payload, fb_arr):
+    # Writes the tiles of a delta payload into a (height, stride) uint8 array,
+    # such as a view over a memory-mapped framebuffer
+    for row, col, rows, cols, data in iter_tiles(payload):
+        fb_arr[row : row + rows, col : col + cols] = np.frombuffer(
+            data, dtype=np.uint8
+        ).reshape((rows, cols))
+    return fb_arr
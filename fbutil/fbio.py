@@ -0,0 +1,163 @@
+import argparse
+import fcntl
+import mmap
+import os
+import stat
+import struct
+
+import numpy as np
+
+from fbutil.formats import bytes_per_pixel, encode
+from fbutil.timing import stats
+
+# linux/fb.h
+FBIOGET_VSCREENINFO = 0x4600
+FBIOPAN_DISPLAY = 0x4606
+VSCREENINFO_SIZE = 160
+VSCREENINFO_OFFSETS = 16  # xoffset, yoffset follow xres, yres, xres/yres_virtual
+
+
+def page_offset(yoffset, stride, xoffset=0, bytes_per_pixel=0):
+    # Byte offset of a panned page inside a virtual framebuffer
+    return yoffset * stride + xoffset * bytes_per_pixel
+
+
+def map_framebuffer(path, offset, length, write=False):
+    # Memory-maps `length` bytes of a framebuffer dump or device starting at
+    # `offset` and returns (mmap, uint8 view). mmap offsets have to be aligned
+    # to the allocation granularity, so the mapping starts a little earlier and
+    # the view skips the extra bytes.
+    aligned = offset - offset % mmap.ALLOCATIONGRANULARITY
+    flags = os.O_RDWR if write else os.O_RDONLY
+    fd = os.open(path, flags)
+    try:
+        st = os.fstat(fd)
+        # Character devices report a size of 0, trust the caller there
+        if stat.S_ISREG(st.st_mode) and offset + length > st.st_size:
+            raise ValueError(
+                f"{path} holds {st.st_size} bytes, expected at least {offset + length}"
+            )
+        mm = mmap.mmap(
+            fd,
+            offset - aligned + length,
+            access=mmap.ACCESS_WRITE if write else mmap.ACCESS_READ,
+            offset=aligned,
+        )
+    finally:
+        os.close(fd)
+    view = np.frombuffer(mm, dtype=np.uint8, count=length, offset=offset - aligned)
+    return mm, view
+
+
+def read_framebuffer(path, offset, length):
+    # Fallback for files that cannot be mapped (pipes, some procfs/sysfs nodes)
+    with open(path, "rb") as f:
+        if f.seekable():
+            f.seek(offset)
+        else:
+            # Discard the pages in front of the requested one in bounded chunks
+            skip = offset
+            while skip > 0 and f.read(min(skip, 1 << 20)):
+                skip -= min(skip, 1 << 20)
+        data = f.read(length)
+    if len(data) < length:
+        raise ValueError(
+            f"{path} holds {offset + len(data)} bytes, expected at least {offset + length}"
+        )
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def pan_display(fd, yoffset, xoffset=0):
+    # Pans the visible area of a framebuffer device to (xoffset, yoffset).
+    # Returns False if fd is not a framebuffer device, e.g. a regular file
+    # standing in for one.
+    try:
+        var = bytearray(fcntl.ioctl(fd, FBIOGET_VSCREENINFO, bytes(VSCREENINFO_SIZE)))
+    except OSError:
+        return False
+    struct.pack_into("=II", var, VSCREENINFO_OFFSETS, xoffset, yoffset)
+    fcntl.ioctl(fd, FBIOPAN_DISPLAY, bytes(var))
+    return True
+
+
+def parse_rect(value):
+    # argparse type for an X,Y,WIDTH,HEIGHT rectangle
+    try:
+        x, y, width, height = (int(v) for v in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Expected X,Y,WIDTH,HEIGHT, got {value!r}"
+        ) from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Empty rectangle: {value!r}")
+    return x, y, width, height
+
+
+def clip_rect(rect, width, height):
+    # Intersection of an (x, y, width, height) rectangle with the screen, or
+    # None when they do not overlap
+    x, y, w, h = rect
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, width), min(y + h, height)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class FramebufferRegion:
+    # Writable window onto a rectangle of an existing framebuffer file or
+    # device. Only the rows the rectangle spans are mapped, and `pixels` is a
+    # (height, width * bytes_per_pixel) view of just its columns, so nothing
+    # outside the rectangle is written. Targets that cannot be mapped get a
+    # scratch buffer instead, written back with one pwrite per row on close.
+    def __init__(self, path, rect, stride, bytes_per_pixel):
+        x, y, width, height = rect
+        self.path = path
+        self.offset = page_offset(y, stride, x, bytes_per_pixel)
+        self.stride = stride
+        self.mm = None
+        try:
+            self.mm, data = map_framebuffer(
+                path, page_offset(y, stride), height * stride, write=True
+            )
+            self.pixels = data.reshape((height, stride))[
+                :, x * bytes_per_pixel : (x + width) * bytes_per_pixel
+            ]
+        except OSError:
+            self.pixels = np.zeros((height, width * bytes_per_pixel), dtype=np.uint8)
+
+    def close(self):
+        if self.pixels is None:
+            return
+        stats.count("bytes_written", self.pixels.nbytes)
+        if self.mm is not None:
+            self.pixels = None
+            self.mm.close()
+            return
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            for i, row in enumerate(self.pixels):
+                os.pwrite(fd, row, self.offset + i * self.stride)
+        finally:
+            os.close(fd)
+        self.pixels = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_region(path, img_arr, x, y, width, height, stride, format, force_alpha=False):
+    # Encodes an RGB / RGBA image into an existing framebuffer with its top
+    # left corner at (x, y), clipped to the width x height screen. Returns
+    # the rectangle that was written, or None if it was entirely off screen.
+    rect = clip_rect((x, y, img_arr.shape[1], img_arr.shape[0]), width, height)
+    if rect is None:
+        return None
+    x0, y0, w, h = rect
+    img_arr = img_arr[y0 - y : y0 - y + h, x0 - x : x0 - x + w]
+    with FramebufferRegion(path, rect, stride, bytes_per_pixel(format)) as region:
+        encode(img_arr, format, force_alpha=force_alpha, out=region.pixels)
+    return rect
@@ -0,0 +1,183 @@
+import numpy as np
+
+# Bytes per pixel for every framebuffer format the tools understand
+# The 16-bit formats store each pixel high byte first; their _LE variants
+# store it low byte first, like most little-endian devices do.
+BYTES_PER_PIXEL = {
+    "RGB565": 2,
+    "RGB565_LE": 2,
+    "ARGB8888": 4,
+    "ABGR8888": 4,
+    "BGRA8888": 4,
+    "RGBA8888": 4,
+    "RGB888": 3,
+    "BGR888": 3,
+    "ARGB1555": 2,
+    "ARGB1555_LE": 2,
+    "RGB444": 2,
+    "RGB444_LE": 2,
+    "RGB332": 1,
+}
+
+FORMATS = list(BYTES_PER_PIXEL)
+
+# For the 24 and 32-bit formats, the RGBA channel stored in each byte of a pixel
+CHANNEL_ORDER = {
+    "ARGB8888": (3, 0, 1, 2),
+    "ABGR8888": (3, 2, 1, 0),
+    "BGRA8888": (2, 1, 0, 3),
+    "RGBA8888": (0, 1, 2, 3),
+    "RGB888": (0, 1, 2),
+    "BGR888": (2, 1, 0),
+}
+
+# For RGB565, the byte of each pixel holding the high and low byte of the
+# word, so it can be encoded a byte at a time
+RGB565_BYTES = {
+    "RGB565": (0, 1),
+    "RGB565_LE": (1, 0),
+}
+
+# The packed formats: the (shift, bits) of the red, green, blue and alpha
+# fields in each pixel word, and the word's numpy dtype (byte order)
+PACKED_FORMATS = {
+    "RGB565": (((11, 5), (5, 6), (0, 5), None), ">u2"),
+    "RGB565_LE": (((11, 5), (5, 6), (0, 5), None), "<u2"),
+    "ARGB1555": (((10, 5), (5, 5), (0, 5), (15, 1)), ">u2"),
+    "ARGB1555_LE": (((10, 5), (5, 5), (0, 5), (15, 1)), "<u2"),
+    "RGB444": (((8, 4), (4, 4), (0, 4), None), ">u2"),
+    "RGB444_LE": (((8, 4), (4, 4), (0, 4), None), "<u2"),
+    "RGB332": (((5, 3), (2, 3), (0, 2), None), "u1"),
+}
+
+# Lookup tables scaling a field of n bits back to 0-255, so full intensity
+# decodes to 255
+EXPAND = {
+    bits: np.rint(np.arange(1 << bits) * 255 / ((1 << bits) - 1)).astype(np.uint8)
+    for bits in (1, 2, 3, 4, 5, 6)
+}
+
+
+def bytes_per_pixel(format):
+    if format not in BYTES_PER_PIXEL:
+        raise ValueError(f"Unsupported framebuffer format: {format}")
+    return BYTES_PER_PIXEL[format]
+
+
+def has_alpha(format):
+    # Whether the format stores alpha, i.e. encodes from and decodes to RGBA
+    # rather than RGB
+    bytes_per_pixel(format)
+    if format in CHANNEL_ORDER:
+        return 3 in CHANNEL_ORDER[format]
+    if format in PACKED_FORMATS:
+        return PACKED_FORMATS[format][0][3] is not None
+    return False
+
+
+def calculate_stride(width, format):
+    return width * bytes_per_pixel(format)
+
+
+def frame_size(height, stride):
+    return height * stride
+
+
+def allocate_framebuffer(height, stride):
+    return np.zeros((height, stride), dtype=np.uint8)
+
+
+def pixel_view(fb_arr, width, height, stride, format):
+    # Returns a (height, width, bytes_per_pixel) view of the framebuffer that
+    # skips the stride padding at the end of every row without copying
+    bpp = bytes_per_pixel(format)
+    if stride < width * bpp:
+        raise ValueError(
+            f"Stride {stride} is smaller than a row of {width} {format} pixels"
+        )
+    if not isinstance(fb_arr, np.ndarray):
+        fb_arr = np.frombuffer(fb_arr, dtype=np.uint8)
+    if fb_arr.ndim != 2:
+        fb_arr = fb_arr.reshape(-1)
+        if fb_arr.size < height * stride:
+            raise ValueError(
+                f"Framebuffer holds {fb_arr.size} bytes, expected at least {height * stride}"
+            )
+        fb_arr = fb_arr[: height * stride].reshape((height, stride))
+    return fb_arr[:height, : width * bpp].reshape((height, width, bpp))
+
+
+def encode(arr, format, stride=None, force_alpha=False, out=None, bgr=False):
+    # Packs an RGB or RGBA (height, width, channels) uint8 array into the given
+    # framebuffer format. The result is a (height, stride) uint8 array; pass a
+    # preallocated one as `out` to reuse it between frames. With bgr=True the
+    # input is read as BGR(A), e.g. frames straight from OpenCV.
+    height, width = arr.shape[:2]
+    channels = (2, 1, 0, 3) if bgr else (0, 1, 2, 3)
+    if stride is None:
+        stride = calculate_stride(width, format)
+    if out is None:
+        out = allocate_framebuffer(height, stride)
+    pix = pixel_view(out, width, height, stride, format)
+
+    alpha = arr.shape[2] == 4 and not force_alpha
+    if format in RGB565_BYTES:
+        r = arr[:, :, channels[0]]
+        g = arr[:, :, channels[1]]
+        b = arr[:, :, channels[2]]
+        # RRRRRGGG GGGBBBBB
+        hi = pix[:, :, RGB565_BYTES[format][0]]
+        lo = pix[:, :, RGB565_BYTES[format][1]]
+        np.bitwise_and(r, 0xF8, out=hi)
+        hi |= g >> 5
+        np.left_shift(g, 3, out=lo)
+        lo &= 0xE0
+        lo |= b >> 3
+    elif format in PACKED_FORMATS:
+        fields, dtype = PACKED_FORMATS[format]
+        # Build the pixel words, keeping the top bits of every channel, then
+        # store them in the format's byte order
+        word = np.zeros((height, width), dtype=np.dtype(dtype).newbyteorder("="))
+        part = np.empty_like(word)
+        for channel, field in enumerate(fields):
+            if field is None:
+                continue
+            shift, bits = field
+            if channel == 3 and not alpha:
+                word |= ((1 << bits) - 1) << shift
+                continue
+            np.right_shift(arr[:, :, channels[channel]], 8 - bits, out=part)
+            part <<= shift
+            word |= part
+        pix.view(dtype)[:, :, 0] = word
+    else:
+        for i, channel in enumerate(CHANNEL_ORDER[format]):
+            if channel == 3 and not alpha:
+                pix[:, :, i] = 255
+            else:
+                pix[:, :, i] = arr[:, :, channels[channel]]
+
+    return out
+
+
+def decode(fb_data, width, height, format, stride=None, out=None):
+    # Unpacks framebuffer bytes into an RGBA (formats with alpha) or RGB
+    # (height, width, channels) uint8 array
+    if stride is None:
+        stride = calculate_stride(width, format)
+    pix = pixel_view(fb_data, width, height, stride, format)
+    if out is None:
+        out = np.empty((height, width, 4 if has_alpha(format) else 3), dtype=np.uint8)
+
+    if format in PACKED_FORMATS:
+        fields, dtype = PACKED_FORMATS[format]
+        word = pix.view(dtype)[:, :, 0]
+        for channel, field in enumerate(fields):
+            if field is not None:
+                shift, bits = field
+                out[:, :, channel] = EXPAND[bits][(word >> shift) & ((1 << bits) - 1)]
+    else:
+        for i, channel in enumerate(CHANNEL_ORDER[format]):
+            out[:, :, channel] = pix[:, :, i]
+
+    return out
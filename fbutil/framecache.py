@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from .timing import stats
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".fbutil", "frames")
+
+# Cache size limit in MB
+DEFAULT_CACHE_SIZE = 2048
+
+# Source files are hashed in blocks of this many bytes
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def write_json(path, value):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def source_hash(path, cache_dir=DEFAULT_CACHE_DIR):
+    # sha1 of a source file's contents. The hash is remembered with the file's
+    # size and modification time, so an unchanged file is only read once.
+    st = os.stat(path)
+    path = os.path.abspath(path)
+    known_path = os.path.join(cache_dir, "sources.json")
+    known = {}
+    if os.path.exists(known_path):
+        with open(known_path) as f:
+            known = json.load(f)
+    entry = known.get(path)
+    if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+        return entry["sha1"]
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    known[path] = {
+        "size": st.st_size,
+        "mtime": st.st_mtime_ns,
+        "sha1": digest.hexdigest(),
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    write_json(known_path, known)
+    return known[path]["sha1"]
+
+
+class FrameCache:
+    # On-disk cache of resized video frames, so converting a video again for
+    # another format or stride only has to pack the frames. Every distinct
+    # frame is stored once under objects/, named by the hash of its pixels,
+    # and an index per (source, size, preset, frame selection) lists the
+    # object of each frame. The least recently used objects are evicted once
+    # the cache outgrows max_bytes.
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE * 1e6):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_dir = os.path.join(cache_dir, "index")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def index_path(self, source, width, height, preset, start=None, end=None, fps=None):
+        key = f"{source}:{width}x{height}:{preset}"
+        if (start, end, fps) != (None, None, None):
+            # Only part of the video, or frames picked at another rate
+            key += f":{start}:{end}:{fps}"
+        return os.path.join(
+            self.index_dir, hashlib.sha1(key.encode()).hexdigest() + ".json"
+        )
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest + ".npy")
+
+    def lookup(self, index_path):
+        # Returns the index ({"fps": ..., "frames": [hash, ...]}), or None
+        # unless every frame it lists is still cached. Marks them as used.
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path) as f:
+            index = json.load(f)
+        paths = [self.object_path(digest) for digest in set(index["frames"])]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        for path in paths + [index_path]:
+            os.utime(path)
+        return index
+
+    def read(self, frames):
+        # Yields the frames listed in an index, in order. A frame repeated
+        # back to back is loaded once and yielded again.
+        previous = frame = None
+        for digest in frames:
+            if digest != previous:
+                frame = np.load(self.object_path(digest))
+                previous = digest
+            yield frame
+
+    def store(self, frame):
+        # Saves a frame under the hash of its shape and pixels and returns the
+        # hash. Frames that are already cached are not written again.
+        frame = np.ascontiguousarray(frame)
+        digest = hashlib.sha1(str(frame.shape).encode())
+        digest.update(frame.data)
+        digest = digest.hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            os.utime(path)
+            stats.count("cache_shared")
+            return digest
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, frame)
+        os.replace(tmp_path, path)
+        stats.count("cache_stored")
+        return digest
+
+    def save_index(self, index_path, frames, fps):
+        write_json(index_path, {"fps": fps, "frames": frames})
+
+    def evict(self):
+        # Removes the least recently used objects until the cache fits in
+        # max_bytes. Returns the size left.
+        objects = []
+        total = 0
+        for name in os.listdir(self.objects_dir):
+            if name.endswith(".npy"):
+                path = os.path.join(self.objects_dir, name)
+                st = os.stat(path)
+                objects.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        objects.sort()
+        for _, size, path in objects:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+        return total
@@ -0,0 +1,151 @@
+import hashlib
+import os
+
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".fbutil", "glyphs")
+
+# Glyphs rasterized up front; anything else is added the first time it is used
+DEFAULT_CHARSET = "".join(chr(c) for c in range(32, 127))
+
+# Extra space between lines, matching ImageDraw.multiline_text
+LINE_SPACING = 4
+
+_atlases = {}
+
+
+class GlyphAtlas:
+    # Alpha masks of every glyph of one font at one size, with the offsets
+    # needed to place them, so strings can be composed without FreeType
+    def __init__(self, font_path=None, font_size=8):
+        self.font_path = font_path
+        self.font_size = font_size
+        self._font = None
+        self.glyphs = {}
+        self.dirty = False
+
+    @property
+    def line_height(self):
+        mask, _, top, _ = self.glyph("A")
+        return top + mask.shape[0] + LINE_SPACING
+
+    @property
+    def font(self):
+        if self._font is None:
+            self._font = (
+                ImageFont.truetype(self.font_path, self.font_size)
+                if self.font_path
+                else ImageFont.load_default()
+            )
+        return self._font
+
+    def glyph(self, char):
+        # (mask, left, top, advance) for one character
+        if char not in self.glyphs:
+            left, top, right, bottom = self.font.getbbox(char)
+            mask = Image.new("L", (max(right - left, 0), max(bottom - top, 0)), 0)
+            if mask.width and mask.height:
+                ImageDraw.Draw(mask).text((-left, -top), char, font=self.font, fill=255)
+            self.glyphs[char] = (
+                np.asarray(mask),
+                left,
+                top,
+                self.font.getlength(char),
+            )
+            self.dirty = True
+        return self.glyphs[char]
+
+    def render(self, text):
+        # Blits the glyphs of text into an alpha mask covering just the text.
+        # Returns (mask, left, top), the mask's offset from the text position.
+        placed = []
+        line_height = self.line_height
+        y = 0
+        for line in text.split("\n"):
+            pen = 0.0
+            for char in line:
+                mask, left, top, advance = self.glyph(char)
+                if mask.size:
+                    placed.append((mask, int(round(pen)) + left, y + top))
+                pen += advance
+            y += line_height
+        if not placed:
+            return np.zeros((0, 0), dtype=np.uint8), 0, 0
+
+        x0 = min(x for _, x, _ in placed)
+        y0 = min(y for _, _, y in placed)
+        x1 = max(x + m.shape[1] for m, x, _ in placed)
+        y1 = max(y + m.shape[0] for m, _, y in placed)
+        out = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for mask, x, y in placed:
+            region = out[
+                y - y0 : y - y0 + mask.shape[0], x - x0 : x - x0 + mask.shape[1]
+            ]
+            # Overlapping glyphs are blended like FreeType's coverage in
+            # ImageDraw.text: region + mask * (255 - region) / 255, rounded
+            cover = mask.astype(np.uint32) * (255 - region) + 128
+            region += ((cover + (cover >> 8)) >> 8).astype(np.uint8)
+        return out, x0, y0
+
+    def save(self, path):
+        chars = sorted(self.glyphs)
+        masks = [self.glyphs[c][0] for c in chars]
+        meta = np.array(
+            [
+                (ord(c), m.shape[0], m.shape[1], g[1], g[2], g[3])
+                for c, m, g in zip(chars, masks, (self.glyphs[c] for c in chars))
+            ],
+            dtype=np.float64,
+        ).reshape((-1, 6))
+        pixels = (
+            np.concatenate([m.ravel() for m in masks])
+            if masks
+            else np.zeros(0, np.uint8)
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, meta=meta, pixels=pixels)
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    def load(self, path):
+        with np.load(path) as data:
+            meta, pixels = data["meta"], data["pixels"]
+        offset = 0
+        for code, h, w, left, top, advance in meta:
+            h, w = int(h), int(w)
+            mask = pixels[offset : offset + h * w].reshape((h, w))
+            offset += h * w
+            self.glyphs[chr(int(code))] = (mask, int(left), int(top), float(advance))
+
+
+def atlas_cache_path(font_path, font_size, cache_dir=DEFAULT_CACHE_DIR):
+    # Keyed by font file, its modification time, the size and the Pillow
+    # version, so a changed font or renderer never reuses stale glyphs
+    source = "default"
+    if font_path:
+        font_path = os.path.abspath(font_path)
+        source = f"{font_path}:{os.path.getmtime(font_path)}"
+    key = f"{source}:{font_size}:{PIL.__version__}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+
+def load_atlas(font_path=None, font_size=8, cache_dir=DEFAULT_CACHE_DIR):
+    # Returns the atlas for a font from memory, the disk cache, or by
+    # rasterizing DEFAULT_CHARSET once and saving it
+    key = (font_path and os.path.abspath(font_path), font_size)
+    if key in _atlases:
+        return _atlases[key]
+
+    path = atlas_cache_path(font_path, font_size, cache_dir) if cache_dir else None
+    atlas = GlyphAtlas(font_path, font_size)
+    if path and os.path.exists(path):
+        atlas.load(path)
+    for char in DEFAULT_CHARSET:
+        atlas.glyph(char)
+    if path and atlas.dirty:
+        atlas.save(path)
+    _atlases[key] = atlas
+    return atlas
@@ -0,0 +1,141 @@
+import hashlib
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from .formats import bytes_per_pixel, calculate_stride, decode, has_alpha
+from .stream import read_exact_into
+from .timing import stats
+
+# A mirror stream starts with a HEADER (magic, width, height, channels) and
+# continues with updates. Each update is an UPDATE header (capture time,
+# sequence number, tile count, flags, payload size) and its payload: that many
+# tiles, each a TILE header (x, y, width, height in pixels) and the tile's
+# decoded RGB or RGBA pixels row by row. With FLAG_ZLIB the payload is
+# zlib-compressed.
+MAGIC = b"FBMR"
+HEADER = struct.Struct("<4sIIB")
+UPDATE = struct.Struct("<dIIBI")
+TILE = struct.Struct("<HHHH")
+FLAG_ZLIB = 1
+
+
+class MirrorSource:
+    # Turns successive reads of a framebuffer into mirror updates. Every
+    # tile_size x tile_size pixel tile is hashed, and only the tiles whose
+    # hash changed since the last update are decoded and sent. The first
+    # update holds the whole screen.
+    def __init__(
+        self, width, height, format, stride=None, tile_size=32, compress=False
+    ):
+        if stride is None:
+            stride = calculate_stride(width, format)
+        self.width, self.height = width, height
+        self.format = format
+        self.stride = stride
+        self.bpp = bytes_per_pixel(format)
+        self.tile_size = tile_size
+        self.compress = compress
+        self.hashes = {}
+        self.sequence = 0
+
+    def header(self):
+        channels = 4 if has_alpha(self.format) else 3
+        return HEADER.pack(MAGIC, self.width, self.height, channels)
+
+    def changed_tiles(self, fb_arr):
+        # (x, y, width, height) of the tiles that changed, with neighbouring
+        # changed tiles in a tile row merged into one run
+        size = self.tile_size
+        tiles = []
+        for y in range(0, self.height, size):
+            band = fb_arr[y : y + size]
+            for x in range(0, self.width, size):
+                tile = band[:, x * self.bpp : (x + size) * self.bpp]
+                digest = hashlib.blake2b(tile.tobytes(), digest_size=16).digest()
+                if self.hashes.get((x, y)) == digest:
+                    continue
+                self.hashes[(x, y)] = digest
+                w = min(size, self.width - x)
+                if tiles and tiles[-1][1] == y and tiles[-1][0] + tiles[-1][2] == x:
+                    tiles[-1] = (tiles[-1][0], y, tiles[-1][2] + w, tiles[-1][3])
+                else:
+                    tiles.append((x, y, w, band.shape[0]))
+        return tiles
+
+    def update(self, fb_data, captured=None):
+        # Returns the update message for the current framebuffer contents, or
+        # None when nothing changed
+        if captured is None:
+            captured = time.time()
+        fb_arr = np.frombuffer(fb_data, dtype=np.uint8)
+        fb_arr = fb_arr[: self.height * self.stride].reshape((self.height, self.stride))
+        with stats.timer("hash"):
+            tiles = self.changed_tiles(fb_arr)
+        if not tiles:
+            return None
+
+        with stats.timer("decode"):
+            parts = []
+            for x, y, w, h in tiles:
+                region = fb_arr[y : y + h, x * self.bpp : (x + w) * self.bpp]
+                parts.append(TILE.pack(x, y, w, h))
+                parts.append(decode(region, w, h, self.format, w * self.bpp).tobytes())
+            payload = b"".join(parts)
+        flags = 0
+        if self.compress:
+            with stats.timer("compress"):
+                payload = zlib.compress(payload, 1)
+            flags |= FLAG_ZLIB
+        message = UPDATE.pack(captured, self.sequence, len(tiles), flags, len(payload))
+        self.sequence += 1
+        stats.count("tiles", len(tiles))
+        return message + payload
+
+
+def read_header(f):
+    # Returns (width, height, channels) from the start of a mirror stream
+    data = bytearray(HEADER.size)
+    if not read_exact_into(f, data):
+        raise EOFError("The mirror stream is empty")
+    magic, width, height, channels = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("Not a mirror stream")
+    return width, height, channels
+
+
+def read_updates(f):
+    # Yields (captured, sequence, tile_count, payload, size) for every update,
+    # with the payload decompressed and size the bytes it took in the stream
+    header = bytearray(UPDATE.size)
+    while read_exact_into(f, header):
+        captured, sequence, count, flags, length = UPDATE.unpack(header)
+        payload = bytearray(length)
+        if not read_exact_into(f, payload):
+            raise EOFError("The mirror stream ended in the middle of an update")
+        size = UPDATE.size + length
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        yield captured, sequence, count, payload, size
+
+
+class MirrorCanvas:
+    # The viewer's copy of the screen, kept up to date with the tiles of every
+    # update
+    def __init__(self, width, height, channels):
+        self.pixels = np.zeros((height, width, channels), dtype=np.uint8)
+
+    def apply(self, payload, count):
+        payload = memoryview(payload).cast("B")
+        channels = self.pixels.shape[2]
+        offset = 0
+        for _ in range(count):
+            x, y, w, h = TILE.unpack_from(payload, offset)
+            offset += TILE.size
+            length = w * h * channels
+            self.pixels[y : y + h, x : x + w] = np.frombuffer(
+                payload[offset : offset + length], dtype=np.uint8
+            ).reshape((h, w, channels))
+            offset += length
@@ -0,0 +1,261 @@
+import itertools
+import os
+import queue
+import threading
+import traceback
+
+from .timing import stats
+
+_DONE = object()
+
+
+def run_pipeline(
+    items, convert, write, convert_workers=4, write_workers=1, queue_size=8
+):
+    # Streams items through convert and write stages connected by bounded
+    # queues. Items are pulled from the iterable in the calling thread, so a
+    # slow convert or write stage stalls the producer instead of piling up
+    # decoded items in memory. write(index, result) calls are issued in the
+    # order the items were produced; with write_workers > 1 they may overlap.
+    # Returns the number of items written.
+    convert_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+    # Caps every item between the producer and the end of its write, including
+    # out-of-order results waiting for an earlier item to finish converting
+    in_flight = threading.Semaphore(convert_workers + write_workers + 2 * queue_size)
+    stop = threading.Event()
+    errors = []
+    reorder_lock = threading.Lock()
+    pending = {}
+    state = {"next_index": 0, "converters_left": convert_workers}
+    written = []
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def fail(e):
+        errors.append(e)
+        stop.set()
+
+    def convert_worker():
+        try:
+            while True:
+                job = get(convert_queue)
+                if job is _DONE:
+                    break
+                index, item = job
+                result = convert(item)
+                with reorder_lock:
+                    pending[index] = result
+                    while state["next_index"] in pending:
+                        next_index = state["next_index"]
+                        if not put(write_queue, (next_index, pending.pop(next_index))):
+                            return
+                        stats.gauge("write_queue", write_queue.qsize())
+                        state["next_index"] += 1
+        except Exception as e:
+            fail(e)
+        finally:
+            with reorder_lock:
+                state["converters_left"] -= 1
+                if state["converters_left"] == 0:
+                    for _ in range(write_workers):
+                        put(write_queue, _DONE)
+
+    def write_worker():
+        try:
+            while True:
+                job = get(write_queue)
+                if job is _DONE:
+                    break
+                write(*job)
+                written.append(job[0])
+                in_flight.release()
+        except Exception as e:
+            fail(e)
+
+    threads = [
+        threading.Thread(target=convert_worker, daemon=True)
+        for _ in range(convert_workers)
+    ] + [
+        threading.Thread(target=write_worker, daemon=True) for _ in range(write_workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for index, item in enumerate(items):
+            while not in_flight.acquire(timeout=0.1):
+                if stop.is_set():
+                    break
+            if stop.is_set() or not put(convert_queue, (index, item)):
+                break
+            stats.gauge("convert_queue", convert_queue.qsize())
+    except BaseException as e:
+        fail(e)
+    finally:
+        for _ in range(convert_workers):
+            put(convert_queue, _DONE)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return len(written)
+
+
+class SharedSlots:
+    # A ring of equally sized uint8 arrays in one shared memory block. Worker
+    # processes open the block by name and address the arrays by slot number,
+    # so frames are handed over without being pickled.
+    def __init__(self, slots, shape, name=None):
+        from multiprocessing import shared_memory
+
+        import numpy as np
+
+        self.shape = tuple(shape)
+        size = slots * int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.shm = shared_memory.SharedMemory(name)
+        self.arrays = np.ndarray(
+            (slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf
+        )
+
+    @property
+    def spec(self):
+        # Arguments that open the same block in another process
+        return len(self.arrays), self.shape, self.shm.name
+
+    def close(self, unlink=False):
+        self.arrays = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _process_worker(tasks, results, input_spec, output_spec, convert, args):
+    inputs = SharedSlots(*input_spec)
+    outputs = SharedSlots(*output_spec)
+    try:
+        while True:
+            job = tasks.get()
+            if job is None:
+                break
+            slot, index = job
+            try:
+                result = convert(inputs.arrays[slot], outputs.arrays[slot], *args)
+            except Exception:
+                results.put((slot, index, None, traceback.format_exc()))
+                break
+            results.put((slot, index, result, None))
+    finally:
+        inputs.close()
+        outputs.close()
+
+
+def run_process_pipeline(
+    items, convert, write, output_shape, args=(), processes=None, slots=None
+):
+    # Like run_pipeline, but convert runs in worker processes, so it is not
+    # held back by the GIL. items yields (array, meta) pairs, with arrays of
+    # one shape; each array is copied into a free slot of a shared memory
+    # ring and converted there by convert(array, out, *args), which fills out
+    # (an output_shape uint8 array in a matching output ring) and returns a
+    # small picklable result. convert must be a module-level function.
+    # write(index, out, meta, result) is called in the calling process in
+    # item order; out is only valid until it returns. Decoding runs ahead of
+    # writing by at most `slots` items. Returns the number of items written.
+    import multiprocessing
+
+    if processes is None:
+        processes = os.cpu_count() or 4
+    if slots is None:
+        slots = 2 * processes
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        return 0
+
+    context = multiprocessing.get_context("spawn")
+    tasks = context.Queue()
+    results = context.Queue()
+    inputs = SharedSlots(slots, first[0].shape)
+    outputs = SharedSlots(slots, output_shape)
+    workers = [
+        context.Process(
+            target=_process_worker,
+            args=(tasks, results, inputs.spec, outputs.spec, convert, args),
+            daemon=True,
+        )
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    free = list(range(slots))
+    pending = {}
+    metas = {}
+    state = {"next_index": 0}
+
+    def collect():
+        # Waits for one converted item and writes every item that is now next
+        while True:
+            try:
+                slot, index, result, error = results.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if not all(worker.is_alive() for worker in workers):
+                    raise RuntimeError("A conversion worker process exited")
+        if error is not None:
+            raise RuntimeError(f"Converting item {index} failed:\n{error}")
+        pending[index] = (slot, result)
+        while state["next_index"] in pending:
+            index = state["next_index"]
+            slot, result = pending.pop(index)
+            write(index, outputs.arrays[slot], metas.pop(index), result)
+            free.append(slot)
+            state["next_index"] += 1
+
+    submitted = 0
+    try:
+        for index, (array, meta) in enumerate(itertools.chain([first], items)):
+            if array.shape != inputs.shape:
+                raise ValueError(
+                    f"Item {index} has shape {array.shape}, expected {inputs.shape}"
+                )
+            while not free:
+                collect()
+            slot = free.pop()
+            inputs.arrays[slot] = array
+            metas[index] = meta
+            tasks.put((slot, index))
+            submitted += 1
+            stats.gauge("busy_slots", slots - len(free))
+        while state["next_index"] < submitted:
+            collect()
+    finally:
+        for _ in workers:
+            tasks.put(None)
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        inputs.close(unlink=True)
+        outputs.close(unlink=True)
+    return state["next_index"]
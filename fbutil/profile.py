@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+
+DEFAULT_PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".fbutil", "profiles.json")
+
+# Profile keys the converters can take their arguments from
+GEOMETRY_KEYS = ("width", "height", "stride", "format")
+
+
+def fingerprint(values):
+    # Short, stable hash of the raw sysfs values a profile was built from
+    digest = hashlib.sha1(json.dumps(values, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def load_profiles(path=DEFAULT_PROFILE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_profile(profile, path=DEFAULT_PROFILE_PATH):
+    # Profiles are stored in one JSON file keyed by device serial
+    profiles = load_profiles(path)
+    profiles[profile["serial"]] = profile
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profiles, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class StaleProfileError(ValueError):
+    pass
+
+
+def load_profile(path=DEFAULT_PROFILE_PATH, serial=None, fingerprint=None):
+    # Picks the profile for serial (the device's ro.serialno, as fbinfo saves
+    # it), or the only saved device. With a fingerprint of the device's
+    # current sysfs values, a profile built from different ones is refused.
+    profiles = load_profiles(path)
+    if not profiles:
+        raise ValueError(f"No device profiles found in {path}, run fbinfo first")
+    if serial:
+        if serial not in profiles:
+            raise ValueError(f"No profile for device {serial} in {path}")
+        profile = profiles[serial]
+    elif len(profiles) > 1:
+        raise ValueError(
+            f"{path} has profiles for {', '.join(sorted(profiles))}, pick one with --profile SERIAL"
+        )
+    else:
+        profile = next(iter(profiles.values()))
+    if fingerprint is not None and profile.get("fingerprint") != fingerprint:
+        raise StaleProfileError(
+            f"The profile of {profile['serial']} is stale: it was saved for "
+            f"fingerprint {profile.get('fingerprint')}, the device now has {fingerprint}"
+        )
+    return profile
+
+
+def add_profile_arguments(parser):
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="SERIAL",
+        help="Take the width, height, stride and format from the device profile saved by fbinfo.",
+    )
+    parser.add_argument(
+        "--profile-path",
+        type=str,
+        default=DEFAULT_PROFILE_PATH,
+        help=f"Device profile file (default: {DEFAULT_PROFILE_PATH}).",
+    )
+
+
+def apply_profile(
+    parser, args, default_format="RGB565", required=("width", "height"), formats=None
+):
+    # Fills geometry arguments the user left out from the selected profile, then
+    # applies the tool's defaults
+    if args.profile is not None:
+        try:
+            profile = load_profile(args.profile_path, args.profile or None)
+        except ValueError as e:
+            parser.error(str(e))
+        for key in GEOMETRY_KEYS:
+            if getattr(args, key, None) is None and profile.get(key) is not None:
+                setattr(args, key, profile[key])
+    if getattr(args, "format", None) is None:
+        args.format = default_format
+    if formats is not None and args.format is not None and args.format not in formats:
+        parser.error(f"Unsupported framebuffer format: {args.format}")
+    for key in required:
+        if getattr(args, key, None) is None:
+            parser.error(f"{key} is required (or use --profile)")
+    return args
@@ -0,0 +1,178 @@
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from fbutil.fbio import clip_rect
+from fbutil.formats import (
+    allocate_framebuffer,
+    bytes_per_pixel,
+    calculate_stride,
+    encode,
+    has_alpha,
+)
+from fbutil.glyphs import load_atlas
+from fbutil.timing import stats
+
+
+def load_scene(path):
+    # Scene descriptions are JSON, or YAML for .yaml / .yml files (PyYAML is
+    # only needed for those)
+    with open(path) as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(
+                    "YAML scenes need PyYAML, install it with: pip3 install pyyaml"
+                ) from None
+            scene = yaml.safe_load(f)
+        else:
+            scene = json.load(f)
+    if isinstance(scene, list):
+        scene = {"layers": scene}
+    if not isinstance(scene, dict) or not isinstance(scene.get("layers"), list):
+        raise ValueError(f"{path} has no list of layers")
+    return scene
+
+
+def parse_color(value):
+    # "#RRGGBB" or "#RRGGBBAA" to an (r, g, b, a) tuple
+    value = value.lstrip("#")
+    if len(value) not in (6, 8):
+        raise ValueError(f"Invalid color: #{value}")
+    rgba = bytes.fromhex(value)
+    return tuple(rgba) + ((255,) if len(rgba) == 3 else ())
+
+
+def layer_key(layer):
+    # Identifies what a layer looks like; images also depend on the file
+    key = json.dumps(layer, sort_keys=True)
+    if layer.get("type") == "image":
+        key += f":{os.path.getmtime(layer['path'])}"
+    return key
+
+
+def render_layer(layer, width, height):
+    # Rasterizes one layer to a premultiplied float32 RGBA array with its
+    # opacity applied. Returns (rgba, x, y) with (x, y) its top left corner.
+    kind = layer.get("type")
+    x, y = layer.get("x", 0), layer.get("y", 0)
+    if kind == "fill":
+        # Without a size the fill covers the rest of the screen
+        size = (layer.get("height", height - y), layer.get("width", width - x))
+        rgba = np.empty(size + (4,), dtype=np.float32)
+        rgba[:] = parse_color(layer["color"])
+    elif kind == "image":
+        img = Image.open(layer["path"])
+        if "width" in layer or "height" in layer:
+            img = img.resize(
+                (layer.get("width", img.width), layer.get("height", img.height))
+            )
+        rgba = np.asarray(img.convert("RGBA"), dtype=np.float32)
+    elif kind == "text":
+        atlas = load_atlas(layer.get("font_path"), layer.get("font_size", 8))
+        mask, left, top = atlas.render(layer["text"])
+        x, y = x + left, y + top
+        rgba = np.empty(mask.shape + (4,), dtype=np.float32)
+        rgba[:] = parse_color(layer.get("color", "#ffffff"))
+        rgba[:, :, 3] *= mask / 255
+    else:
+        raise ValueError(f"Unknown layer type: {kind}")
+
+    alpha = rgba[:, :, 3:] * (float(layer.get("opacity", 1)) / 255)
+    rgba[:, :, :3] *= alpha
+    rgba[:, :, 3:] = alpha * 255
+    return rgba, x, y
+
+
+class Compositor:
+    # Composites scene layers into a framebuffer. Rendered layers are cached,
+    # and when the scene changes only the rectangles covered by layers that
+    # were added, removed, moved or altered are composited and encoded again.
+    def __init__(self, width, height, format="RGB565", stride=None, force_alpha=False):
+        if stride is None:
+            stride = calculate_stride(width, format)
+        self.width, self.height = width, height
+        self.format = format
+        self.force_alpha = force_alpha
+        self.bpp = bytes_per_pixel(format)
+        self.fb_arr = allocate_framebuffer(height, stride)
+        # Premultiplied RGBA working buffer
+        self.work = np.zeros((height, width, 4), dtype=np.float32)
+        self.cache = {}
+        self.entries = None
+
+    def layer(self, layer):
+        key = layer_key(layer)
+        if key not in self.cache:
+            with stats.timer("render_layer"):
+                self.cache[key] = render_layer(layer, self.width, self.height)
+        return key, self.cache[key]
+
+    def rect(self, entry):
+        rgba, x, y = entry[1]
+        return clip_rect((x, y, rgba.shape[1], rgba.shape[0]), self.width, self.height)
+
+    def render(self, layers):
+        # Brings the framebuffer up to date with layers and returns the list of
+        # (x, y, width, height) rectangles that were rewritten
+        entries = [self.layer(layer) for layer in layers]
+        if self.entries is None:
+            dirty = [(0, 0, self.width, self.height)]
+        else:
+            dirty = []
+            for i in range(max(len(entries), len(self.entries))):
+                old = self.entries[i] if i < len(self.entries) else None
+                new = entries[i] if i < len(entries) else None
+                if old is not None and new is not None and old[0] == new[0]:
+                    continue
+                for entry in (old, new):
+                    rect = entry and self.rect(entry)
+                    if rect and rect not in dirty:
+                        dirty.append(rect)
+
+        for rect in dirty:
+            with stats.timer("composite"):
+                self.composite(rect, entries)
+        stats.gauge("dirty_regions", len(dirty))
+
+        # Keep only the layers still in the scene
+        keys = {key for key, _ in entries}
+        self.cache = {key: v for key, v in self.cache.items() if key in keys}
+        self.entries = entries
+        return dirty
+
+    def composite(self, rect, entries):
+        x, y, w, h = rect
+        work = self.work[y : y + h, x : x + w]
+        work[:] = 0
+        for _, (rgba, lx, ly) in entries:
+            # Part of the layer inside rect, relative to rect
+            overlap = clip_rect((lx - x, ly - y, rgba.shape[1], rgba.shape[0]), w, h)
+            if overlap is None:
+                continue
+            ox, oy, ow, oh = overlap
+            src = rgba[oy + y - ly : oy + y - ly + oh, ox + x - lx : ox + x - lx + ow]
+            dst = work[oy : oy + oh, ox : ox + ow]
+            # Source over destination
+            dst *= 1 - src[:, :, 3:] / 255
+            dst += src
+
+        # Back to straight alpha for the encoder
+        alpha = work[:, :, 3:]
+        img_arr = np.empty((h, w, 4), dtype=np.uint8)
+        rgb = np.divide(
+            work[:, :, :3] * 255,
+            alpha,
+            out=np.zeros((h, w, 3), dtype=np.float32),
+            where=alpha > 0,
+        )
+        np.rint(rgb, out=rgb)
+        img_arr[:, :, :3] = np.clip(rgb, 0, 255)
+        img_arr[:, :, 3:] = np.rint(alpha)
+        if not has_alpha(self.format):
+            img_arr = img_arr[:, :, :3]
+        region = self.fb_arr[y : y + h, x * self.bpp : (x + w) * self.bpp]
+        encode(img_arr, self.format, force_alpha=self.force_alpha, out=region)
@@ -0,0 +1,122 @@
+import os
+import queue
+import subprocess
+import threading
+import time
+
+from .timing import stats
+
+
+class ShellSession:
+    # Keeps one shell process (e.g. ["adb", "shell", "su"] or ["sh"]) open and
+    # runs commands in it, so each command costs a round-trip instead of a new
+    # adb connection and su authorization. Every command is followed by a
+    # unique sentinel on stdout (carrying the exit code) and on stderr, which
+    # marks where its output ends. A session that died is restarted on the
+    # next command.
+    def __init__(self, command, timeout=30):
+        self.command = command
+        self.timeout = timeout
+        self._proc = None
+        self._stdout = None
+        self._stderr = None
+
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        self.close()
+        stats.count("shell_starts")
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self._stdout = self._pump(self._proc.stdout)
+        self._stderr = self._pump(self._proc.stderr)
+
+    @staticmethod
+    def _pump(stream):
+        # Reads lines on a thread so a chatty stderr can never block stdout
+        lines = queue.Queue()
+
+        def read():
+            for line in stream:
+                lines.put(line)
+            lines.put(None)
+
+        threading.Thread(target=read, daemon=True).start()
+        return lines
+
+    def run(self, command, timeout=None):
+        # Returns a subprocess.CompletedProcess like subprocess.run would
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        sentinel = f"__fbutil_{os.urandom(16).hex()}__"
+        # The command gets its own empty stdin, otherwise anything reading
+        # stdin (cat, read) would swallow the sentinel and hang
+        framed = (
+            f"{{ {command}\n}} </dev/null\n"
+            f"__fbutil_rc=$?; printf '\\n%s %d\\n' {sentinel} $__fbutil_rc; "
+            f"printf '\\n%s\\n' {sentinel} >&2\n"
+        )
+        for attempt in range(2):
+            if not self.alive():
+                self.start()
+            try:
+                self._proc.stdin.write(framed)
+                self._proc.stdin.flush()
+                break
+            except (BrokenPipeError, OSError):
+                # The session died since the last command, retry on a new one
+                self.close()
+                if attempt:
+                    raise
+
+        stdout, returncode = self._collect(self._stdout, sentinel, command, timeout)
+        stderr, _ = self._collect(self._stderr, sentinel, command, timeout)
+        stats.add_time("shell_command", time.perf_counter() - start)
+        return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+
+    def _collect(self, lines, sentinel, command, timeout):
+        output = []
+        while True:
+            try:
+                line = lines.get(timeout=timeout)
+            except queue.Empty:
+                # The shell is stuck (e.g. waiting for more input), start over
+                self.close()
+                raise subprocess.TimeoutExpired(command, timeout)
+            if line is None:
+                # The session exited while running the command (e.g. `exit`)
+                returncode = self._proc.wait() if self._proc else -1
+                self.close()
+                return "".join(output), returncode
+            if line.startswith(sentinel):
+                rest = line[len(sentinel) :].strip()
+                # Drop the newline printed in front of the sentinel
+                return "".join(output)[:-1], int(rest) if rest else 0
+            output.append(line)
+
+    def close(self):
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,131 @@
+import os
+import socket
+import sys
+
+import numpy as np
+
+from .timing import stats
+
+CHUNK_SIZE = 1 << 16
+
+_stdout_fd = None
+_stdout = None
+
+
+def is_stream_target(target):
+    return target == "-" or target.startswith("tcp:")
+
+
+def reserve_stdout():
+    # Keeps the real stdout for frame data and points fd 1 and sys.stdout at
+    # stderr, so progress messages do not end up in the stream
+    global _stdout_fd, _stdout
+    if _stdout_fd is None:
+        sys.stdout.flush()
+        _stdout_fd = os.dup(1)
+        os.dup2(2, 1)
+        _stdout, sys.stdout = sys.stdout, sys.stderr
+    return _stdout_fd
+
+
+def restore_stdout():
+    # Undoes reserve_stdout once the stream is done, so later commands run in
+    # the same process print to stdout again
+    global _stdout_fd, _stdout
+    if _stdout_fd is None:
+        return
+    sys.stderr.flush()
+    os.dup2(_stdout_fd, 1)
+    os.close(_stdout_fd)
+    sys.stdout = _stdout
+    _stdout_fd = _stdout = None
+
+
+class FrameStream:
+    # Writes frames to a file descriptor in bounded chunks. Writes block while
+    # the reader is behind (full pipe or socket buffer), which stalls the
+    # producer instead of buffering frames in memory.
+    def __init__(self, fd, chunk_size=CHUNK_SIZE, owner=None):
+        self.fd = fd
+        self.chunk_size = chunk_size
+        self.bytes_written = 0
+        self._owner = owner
+
+    def write(self, data):
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data).reshape(-1)
+        data = memoryview(data).cast("B")
+        offset = 0
+        while offset < len(data):
+            offset += os.write(self.fd, data[offset : offset + self.chunk_size])
+        self.bytes_written += offset
+        stats.count("bytes_written", offset)
+
+    def close(self):
+        if self.fd is None:
+            return
+        if self._owner is not None:
+            self._owner.close()
+        else:
+            os.close(self.fd)
+        self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_stream(target, chunk_size=CHUNK_SIZE):
+    # target is "-" for stdout, "tcp:HOST:PORT" for a socket, or a path such as
+    # a named pipe or a framebuffer device
+    if target == "-":
+        return FrameStream(os.dup(reserve_stdout()), chunk_size)
+    if target.startswith("tcp:"):
+        host, port = target[4:].rsplit(":", 1)
+        sock = socket.create_connection((host or "localhost", int(port)))
+        return FrameStream(sock.fileno(), chunk_size, owner=sock)
+    fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    return FrameStream(fd, chunk_size)
+
+
+def write_output(target, fb_arr):
+    # Saves a single framebuffer to a file, or streams it when target is "-" or
+    # a tcp: address
+    if is_stream_target(target):
+        with open_stream(target) as stream:
+            stream.write(fb_arr)
+    else:
+        fb_arr.tofile(target)
+        stats.count("bytes_written", fb_arr.nbytes)
+
+
+def read_exact_into(f, buf):
+    # Fills buf from a file object, looping over the short reads pipes and
+    # sockets return. Returns False on a clean end of stream.
+    view = memoryview(buf).cast("B")
+    filled = 0
+    while filled < len(view):
+        n = f.readinto(view[filled:])
+        if not n:
+            if filled:
+                raise EOFError(
+                    f"Stream ended in the middle of a frame ({filled} of {len(view)} bytes)"
+                )
+            return False
+        filled += n
+    return True
+
+
+def open_stream_reader(source):
+    # Counterpart of open_stream: "-" reads stdin, "tcp:HOST:PORT" listens and
+    # accepts a single connection, anything else is opened as a file or pipe
+    if source == "-":
+        return sys.stdin.buffer
+    if source.startswith("tcp:"):
+        host, port = source[4:].rsplit(":", 1)
+        with socket.create_server((host, int(port))) as server:
+            conn, _ = server.accept()
+        return conn.makefile("rb")
+    return open(source, "rb")
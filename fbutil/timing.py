@@ -0,0 +1,250 @@
+import atexit
+import contextlib
+import json
+import sys
+import threading
+import time
+
+
+class StageTimes:
+    # Accumulates per-item stage durations (in seconds) from any thread
+    def __init__(self):
+        self.totals = {}
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, times):
+        with self._lock:
+            self.count += 1
+            for stage, seconds in times.items():
+                self.totals[stage] = self.totals.get(stage, 0) + seconds
+
+    def averages(self):
+        with self._lock:
+            if not self.count:
+                return {}
+            return {stage: total / self.count for stage, total in self.totals.items()}
+
+
+def format_times(times):
+    return ", ".join(
+        f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in times.items()
+    )
+
+
+class _Timer:
+    __slots__ = ("stats", "stage", "start")
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add_time(self.stage, time.perf_counter() - self.start)
+
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Stats:
+    # Run-wide instrumentation shared by the tools: per-stage timers, counters
+    # (frames, bytes written, ...) and sampled gauges such as queue depths.
+    # It is disabled unless a tool is run with --stats and friends, and then
+    # every method returns straight away, so the hooks can stay in hot paths.
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        # Stages and gauges are [samples, total, max]
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.reset()
+        self.enabled = True
+
+    def _sample(self, table, name, value):
+        with self._lock:
+            entry = table.get(name)
+            if entry is None:
+                table[name] = [1, value, value]
+            else:
+                entry[0] += 1
+                entry[1] += value
+                if value > entry[2]:
+                    entry[2] = value
+
+    def add_time(self, stage, seconds):
+        if self.enabled:
+            self._sample(self.stages, stage, seconds)
+
+    def add_times(self, times):
+        if self.enabled:
+            for stage, seconds in times.items():
+                self._sample(self.stages, stage, seconds)
+
+    def timer(self, stage):
+        # with stats.timer("pack"): ...
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self._sample(self.gauges, name, value)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": count,
+                    "total_ms": total * 1000,
+                    "avg_ms": total / count * 1000,
+                    "max_ms": peak * 1000,
+                }
+                for stage, (count, total, peak) in self.stages.items()
+            }
+            gauges = {
+                name: {"samples": count, "avg": total / count, "max": peak}
+                for name, (count, total, peak) in self.gauges.items()
+            }
+            counters = dict(self.counters)
+        rates = {}
+        if elapsed:
+            if "frames" in counters:
+                rates["frames_per_s"] = counters["frames"] / elapsed
+            for name, value in counters.items():
+                if name.startswith("bytes_"):
+                    rates[f"{name}_mb_per_s"] = value / elapsed / 1e6
+        return {
+            "elapsed_s": elapsed,
+            "stages": stages,
+            "counters": counters,
+            "gauges": gauges,
+            "rates": rates,
+        }
+
+
+# The instance every tool and fbutil module reports to
+stats = Stats()
+
+
+def format_report(report):
+    lines = [f"Elapsed: {report['elapsed_s']:.3f}s"]
+    for stage, s in report["stages"].items():
+        lines.append(
+            f"  {stage:<16} {s['count']:>7} x {s['avg_ms']:9.3f} ms avg "
+            f"{s['max_ms']:9.3f} ms max {s['total_ms']:10.1f} ms total"
+        )
+    for name, value in report["counters"].items():
+        lines.append(f"  {name:<16} {value:>7}")
+    for name, g in report["gauges"].items():
+        lines.append(f"  {name:<16} {g['avg']:9.2f} avg {g['max']:>7} max")
+    for name, value in report["rates"].items():
+        lines.append(f"  {name:<24} {value:.2f}")
+    if "memory" in report:
+        memory = report["memory"]
+        lines.append(f"  peak memory      {memory['peak_bytes'] / 1e6:.1f} MB")
+        lines.extend(f"    {line}" for line in memory["top"])
+    return "\n".join(lines)
+
+
+def add_stats_arguments(parser):
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print per-stage timings, counters and rates to stderr at exit.",
+    )
+    parser.add_argument(
+        "--stats-json",
+        type=str,
+        metavar="PATH",
+        help="Write the same statistics as JSON to PATH at exit.",
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=str,
+        metavar="PATH",
+        help="Profile the main thread with cProfile and save the pstats data to PATH.",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Track Python and NumPy allocations and add the peak and top allocation sites to the statistics.",
+    )
+
+
+# (args, profiler) of the command whose statistics are being collected
+_pending = None
+
+
+def start_stats(args):
+    # Turns on what the arguments from add_stats_arguments ask for; the
+    # results are written by end_stats, at the latest when the process exits
+    global _pending
+    if not (args.stats or args.stats_json or args.cprofile or args.tracemalloc):
+        return
+    end_stats()
+    stats.enable()
+    profiler = None
+    if args.cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if args.tracemalloc:
+        import tracemalloc
+
+        tracemalloc.start()
+    _pending = (args, profiler)
+    atexit.unregister(end_stats)
+    atexit.register(end_stats)
+
+
+def end_stats():
+    # Writes the statistics of the command started with start_stats, if any,
+    # and switches them off. fbutil.cli calls it after every command, so
+    # commands run one after another in one process each get their own.
+    global _pending
+    if _pending is None:
+        return
+    args, profiler = _pending
+    _pending = None
+    try:
+        finish_stats(args, profiler)
+    finally:
+        stats.enabled = False
+
+
+def finish_stats(args, profiler=None):
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        print(f"cProfile data saved to: {args.cprofile}", file=sys.stderr)
+    report = stats.report()
+    if args.tracemalloc:
+        import tracemalloc
+
+        peak = tracemalloc.get_traced_memory()[1]
+        top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+        tracemalloc.stop()
+        report["memory"] = {"peak_bytes": peak, "top": [str(s) for s in top]}
+    if args.stats or args.tracemalloc:
+        print(format_report(report), file=sys.stderr)
+    if args.stats_json:
+        with open(args.stats_json, "w") as f:
+            json.dump(report, f, indent=4)
@@ -0,0 +1,504 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from PIL import Image
+
+from fbutil.batch import expand_inputs, run_batch
+from fbutil.container import FrameContainer, is_container
+from fbutil.fbio import map_framebuffer, page_offset, read_framebuffer
+from fbutil.formats import (
+    FORMATS,
+    bytes_per_pixel,
+    calculate_stride,
+    decode,
+    frame_size,
+    has_alpha,
+)
+from fbutil.mirror import MirrorSource
+from fbutil.profile import add_profile_arguments, apply_profile
+from fbutil.stream import open_stream, reserve_stdout
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+
+def framebuffer_to_png(
+    framebuffer_path,
+    png_path,
+    width,
+    height,
+    format="RGB565",
+    stride=None,
+    yoffset=0,
+    frame=0,
+):
+    if is_container(framebuffer_path):
+        # vid2fb containers carry their own geometry and format
+        container = FrameContainer(framebuffer_path)
+        width, height = container.width, container.height
+        stride, format = container.stride, container.format
+        print(
+            f"Reading frame {frame} of {len(container)} ({width}x{height}, {format}, stride {stride})"
+        )
+        with stats.timer("read"):
+            fb_data = container.render(frame)
+        with stats.timer("convert"):
+            img_arr = decode(fb_data, width, height, format, stride)
+        stats.count("frames")
+        del fb_data
+        container.close()
+        save_png(img_arr, png_path)
+        return
+
+    # Determine the number of bytes per pixel based on the format
+    bpp = bytes_per_pixel(format)
+
+    # Set stride to width * bytes_per_pixel if not provided
+    if stride is None:
+        print("No stride provided, output may be glitched.")
+        stride = width * bpp
+
+    # Map only the page starting at yoffset. Virtual framebuffers are often two
+    # or three screens tall and the other pages never need to be read.
+    offset = page_offset(yoffset, stride)
+    length = frame_size(height, stride)
+    mm = None
+    with stats.timer("read"):
+        try:
+            mm, fb_data = map_framebuffer(framebuffer_path, offset, length)
+        except OSError:
+            fb_data = read_framebuffer(framebuffer_path, offset, length)
+
+    # Strip the stride padding through a strided view and convert to RGB / RGBA
+    with stats.timer("convert"):
+        img_arr = decode(fb_data, width, height, format, stride)
+    stats.count("frames")
+    del fb_data
+    if mm is not None:
+        mm.close()
+
+    save_png(img_arr, png_path)
+
+
+def save_png(img_arr, png_path):
+    # Convert to Image and save as PNG
+    img = Image.fromarray(img_arr, "RGBA" if img_arr.shape[2] == 4 else "RGB")
+    with stats.timer("write"):
+        img.save(png_path)
+    print(f"PNG image saved to: {png_path}")
+
+
+# Output extensions recorded as video, with the codec used for each
+VIDEO_CODECS = {".mp4": "mp4v", ".avi": "MJPG", ".mkv": "XVID"}
+
+
+def encode_frames(frames, output_path, fps, width, height):
+    # Runs on its own thread so capture never waits for an encoder
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension in VIDEO_CODECS:
+        import cv2
+
+        writer = cv2.VideoWriter(
+            output_path,
+            cv2.VideoWriter_fourcc(*VIDEO_CODECS[extension]),
+            fps,
+            (width, height),
+        )
+        if not writer.isOpened():
+            raise ValueError(f"Unable to open {output_path} for writing")
+        try:
+            while (item := frames.get()) is not None:
+                _, img_arr = item
+                conversion = (
+                    cv2.COLOR_RGBA2BGR if img_arr.shape[2] == 4 else cv2.COLOR_RGB2BGR
+                )
+                with stats.timer("encode"):
+                    writer.write(cv2.cvtColor(img_arr, conversion))
+        finally:
+            writer.release()
+    else:
+        # Numbered PNG sequence in the output folder
+        os.makedirs(output_path, exist_ok=True)
+        while (item := frames.get()) is not None:
+            frame_index, img_arr = item
+            img = Image.fromarray(img_arr, "RGBA" if img_arr.shape[2] == 4 else "RGB")
+            with stats.timer("encode"):
+                img.save(os.path.join(output_path, f"{frame_index:06d}.png"))
+
+
+def record_framebuffer(
+    framebuffer_path,
+    output_path,
+    width,
+    height,
+    format="RGB565",
+    stride=None,
+    yoffset=0,
+    fps=10,
+    duration=None,
+    max_frames=None,
+    queue_size=32,
+):
+    if stride is None:
+        print("No stride provided, output may be glitched.")
+        stride = calculate_stride(width, format)
+
+    # The mapping stays open for the whole recording, every read sees the
+    # current contents of the device (or of the file standing in for it)
+    offset = page_offset(yoffset, stride)
+    length = frame_size(height, stride)
+    mm = None
+    try:
+        mm, fb_data = map_framebuffer(framebuffer_path, offset, length)
+    except OSError:
+        fb_data = None
+
+    frames = queue.Queue(queue_size)
+    errors = []
+
+    def encoder():
+        try:
+            encode_frames(frames, output_path, fps, width, height)
+        except Exception as e:
+            errors.append(e)
+            # Keep draining so capture does not block on a dead encoder
+            while frames.get() is not None:
+                pass
+
+    encoder_thread = threading.Thread(target=encoder, daemon=True)
+    encoder_thread.start()
+
+    interval = 1 / fps
+    captured = dropped = missed = 0
+    tick = 0
+    first_capture = last_capture = None
+    start = time.perf_counter()
+    try:
+        while max_frames is None or captured < max_frames:
+            # Absolute deadlines keep the capture rate from drifting; slots
+            # missed while a read took too long are skipped, not made up
+            deadline = start + tick * interval
+            now = time.perf_counter()
+            if now < deadline:
+                time.sleep(deadline - now)
+            elif now - deadline >= interval:
+                skipped = int((now - deadline) / interval)
+                missed += skipped
+                stats.count("missed", skipped)
+                tick += skipped
+            if duration is not None and time.perf_counter() - start >= duration:
+                break
+
+            last_capture = time.perf_counter()
+            if first_capture is None:
+                first_capture = last_capture
+            with stats.timer("capture"):
+                if fb_data is None:
+                    data = read_framebuffer(framebuffer_path, offset, length)
+                else:
+                    data = fb_data
+                img_arr = decode(data, width, height, format, stride)
+            try:
+                frames.put_nowait((captured, img_arr))
+                stats.gauge("encode_queue", frames.qsize())
+            except queue.Full:
+                # The encoder is behind, drop the frame rather than stall
+                dropped += 1
+                stats.count("dropped")
+            captured += 1
+            stats.count("frames")
+            tick += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        frames.put(None)
+        encoder_thread.join()
+        data = fb_data = None
+        if mm is not None:
+            mm.close()
+
+    if errors:
+        raise errors[0]
+    # Rate over the intervals between captures
+    achieved = (captured - 1) / (last_capture - first_capture) if captured > 1 else 0
+    print(
+        f"Captured {captured} frames in {elapsed:.2f}s ({achieved:.2f} fps, target {fps:g}), "
+        f"{dropped} dropped by the encoder, {missed} capture slots missed"
+    )
+    return {
+        "frames": captured,
+        "fps": achieved,
+        "dropped": dropped,
+        "missed": missed,
+    }
+
+
+def mirror_framebuffer(
+    framebuffer_path,
+    target,
+    width,
+    height,
+    format="RGB565",
+    stride=None,
+    yoffset=0,
+    fps=10,
+    duration=None,
+    max_frames=None,
+    tile_size=32,
+    compress=False,
+):
+    # Reads the framebuffer fps times a second and sends the tiles that
+    # changed, already decoded, to fbview through a stream target ("-",
+    # tcp:HOST:PORT or a pipe)
+    if stride is None:
+        print("No stride provided, output may be glitched.")
+        stride = calculate_stride(width, format)
+
+    offset = page_offset(yoffset, stride)
+    length = frame_size(height, stride)
+    mm = None
+    try:
+        mm, fb_data = map_framebuffer(framebuffer_path, offset, length)
+    except OSError:
+        fb_data = None
+
+    source = MirrorSource(width, height, format, stride, tile_size, compress)
+    interval = 1 / fps
+    reads = updates = sent = 0
+    tick = 0
+    start = time.perf_counter()
+    stream = open_stream(target)
+    try:
+        stream.write(source.header())
+        while max_frames is None or reads < max_frames:
+            deadline = start + tick * interval
+            now = time.perf_counter()
+            if now < deadline:
+                time.sleep(deadline - now)
+            elif now - deadline >= interval:
+                tick += int((now - deadline) / interval)
+            if duration is not None and time.perf_counter() - start >= duration:
+                break
+
+            with stats.timer("capture"):
+                if fb_data is None:
+                    data = read_framebuffer(framebuffer_path, offset, length)
+                else:
+                    data = fb_data
+            message = source.update(data)
+            if message is not None:
+                with stats.timer("send"):
+                    stream.write(message)
+                updates += 1
+                sent += len(message)
+                stats.gauge("update_bytes", len(message))
+            reads += 1
+            stats.count("frames")
+            tick += 1
+    except (KeyboardInterrupt, BrokenPipeError):
+        # Interrupted, or the viewer went away
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        data = fb_data = None
+        if mm is not None:
+            mm.close()
+        try:
+            stream.close()
+        except BrokenPipeError:
+            pass
+
+    full = width * height * (4 if has_alpha(format) else 3)
+    print(
+        f"Read the framebuffer {reads} times in {elapsed:.2f}s and sent {updates} updates, "
+        f"{sent / 1e3:.1f} KB ({sent / max(updates, 1) / 1e3:.1f} KB per update, "
+        f"{full / 1e3:.1f} KB for a whole decoded frame)"
+    )
+    return {"reads": reads, "updates": updates, "bytes": sent}
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Convert an Android framebuffer to a PNG image"
+    )
+    parser.add_argument(
+        "framebuffer_path", type=str, help="Path to the input framebuffer binary file."
+    )
+    parser.add_argument(
+        "png_path",
+        type=str,
+        help="Path to the output PNG image (with --record: a video file or a folder for a PNG sequence; with --mirror: - for stdout, tcp:HOST:PORT or a pipe).",
+    )
+    parser.add_argument(
+        "width", type=int, nargs="?", help="Width of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "height", type=int, nargs="?", help="Height of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=None,
+        choices=FORMATS,
+        help="Framebuffer format (default: RGB565).",
+    )
+    parser.add_argument(
+        "--stride",
+        type=int,
+        default=None,
+        help="Stride (number of bytes per row) (default: width * bytes per pixel).",
+    )
+    parser.add_argument(
+        "--page",
+        type=int,
+        default=0,
+        help="Page of a multi-buffered virtual framebuffer to read (default: 0).",
+    )
+    parser.add_argument(
+        "--yoffset",
+        type=int,
+        default=None,
+        help="First row to read, as reported by the panning yoffset (overrides --page).",
+    )
+    parser.add_argument(
+        "--frame",
+        type=int,
+        default=0,
+        help="Frame to read when the input is a vid2fb container (default: 0).",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Capture the framebuffer repeatedly into a video (.mp4, .avi, .mkv) or a PNG sequence folder.",
+    )
+    parser.add_argument(
+        "--mirror",
+        action="store_true",
+        help="Mirror the screen live to fbview, sending only the tiles that changed.",
+    )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=32,
+        help="Tile size in pixels used by --mirror to find changes (default: 32).",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="zlib-compress the updates sent by --mirror.",
+    )
+    parser.add_argument(
+        "--fps",
+        type=float,
+        default=10,
+        help="Capture rate with --record and --mirror (default: 10).",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Seconds to record or mirror (default: until interrupted).",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=None,
+        help="Number of frames to record, or framebuffer reads to mirror (default: until interrupted).",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Convert every framebuffer matching framebuffer_path (a folder or a quoted glob) into the png_path folder.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes used by --batch (default: number of CPUs).",
+    )
+    add_profile_arguments(parser)
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    start_stats(args)
+    # Containers carry their own geometry
+    apply_profile(
+        parser,
+        args,
+        formats=FORMATS,
+        required=(
+            ()
+            if not args.batch and is_container(args.framebuffer_path)
+            else ("width", "height")
+        ),
+    )
+
+    yoffset = (
+        args.yoffset if args.yoffset is not None else args.page * (args.height or 0)
+    )
+
+    if args.batch:
+        run_batch(
+            expand_inputs(args.framebuffer_path),
+            args.png_path,
+            ".png",
+            framebuffer_to_png,
+            {
+                "width": args.width,
+                "height": args.height,
+                "format": args.format,
+                "stride": args.stride,
+                "yoffset": yoffset,
+            },
+            args.jobs,
+        )
+        return
+
+    if args.mirror:
+        if args.png_path == "-":
+            reserve_stdout()
+        mirror_framebuffer(
+            args.framebuffer_path,
+            args.png_path,
+            args.width,
+            args.height,
+            args.format,
+            args.stride,
+            yoffset,
+            args.fps,
+            args.duration,
+            args.frames,
+            args.tile_size,
+            args.compress,
+        )
+        return
+
+    if args.record:
+        record_framebuffer(
+            args.framebuffer_path,
+            args.png_path,
+            args.width,
+            args.height,
+            args.format,
+            args.stride,
+            yoffset,
+            args.fps,
+            args.duration,
+            args.frames,
+        )
+        return
+
+    framebuffer_to_png(
+        args.framebuffer_path,
+        args.png_path,
+        args.width,
+        args.height,
+        args.format,
+        args.stride,
+        yoffset,
+        args.frame,
+    )
+
+
+if __name__ == "__main__":
+    main()
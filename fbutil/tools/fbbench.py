@@ -0,0 +1,406 @@
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image
+
+from fbutil.formats import FORMATS, calculate_stride, encode
+from fbutil.timing import add_stats_arguments, start_stats
+
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+}
+
+# Padded strides add this many bytes to every row, like drivers that align rows
+STRIDE_PADDING = 64
+STRIDES = ["unpadded", "padded"]
+
+TOOLS = ["img2fb", "vid2fb", "txt2fb", "fbfill", "fb2img"]
+
+# Decoded video frames are resized from this size, like a typical source video
+VIDEO_SOURCE_SIZE = (1920, 1080)
+
+# Length of the generated video converted by --scaling
+SCALING_FRAMES = 120
+SCALING_MODES = ["threads", "processes"]
+
+BENCH_TEXT = "The quick brown fox jumps over the lazy dog 0123456789\n" * 8
+
+
+def load_tool(name):
+    return importlib.import_module(f"fbutil.tools.{name}")
+
+
+def synthetic_image(width, height, seed=0):
+    # Gradients with noise on top, so PNG compression has some work to do but
+    # the result is the same on every run
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.empty((height, width, 4), dtype=np.uint8)
+    img[:, :, 0] = x
+    img[:, :, 1] = y
+    img[:, :, 2] = (x + y) / 2
+    img[:, :, 3] = 255 - y
+    img[:, :, :3] ^= rng.integers(0, 32, (height, width, 3), dtype=np.uint8)
+    return img
+
+
+class Inputs:
+    # Generated inputs, created on first use and shared between cases
+    def __init__(self, folder):
+        self.folder = folder
+        self.cache = {}
+
+    def get(self, key, create):
+        if key not in self.cache:
+            self.cache[key] = create()
+        return self.cache[key]
+
+    def png(self, resolution):
+        def create():
+            path = os.path.join(self.folder, f"input_{resolution}.png")
+            width, height = RESOLUTIONS[resolution]
+            Image.fromarray(synthetic_image(width, height), "RGBA").save(path)
+            return path
+
+        return self.get(("png", resolution), create)
+
+    def video_frame(self):
+        def create():
+            width, height = VIDEO_SOURCE_SIZE
+            return np.ascontiguousarray(synthetic_image(width, height)[:, :, :3])
+
+        return self.get("video_frame", create)
+
+    def framebuffer(self, resolution, format, stride):
+        def create():
+            path = os.path.join(
+                self.folder, f"input_{resolution}_{format}_{stride}.bin"
+            )
+            width, height = RESOLUTIONS[resolution]
+            encode(synthetic_image(width, height), format, stride).tofile(path)
+            return path
+
+        return self.get(("framebuffer", resolution, format, stride), create)
+
+
+def make_case(tools, inputs, tool, resolution, format, stride, output):
+    # Returns a no-argument callable running one conversion
+    width, height = RESOLUTIONS[resolution]
+    module = tools[tool]
+    if tool == "img2fb":
+        png_path = inputs.png(resolution)
+        return lambda: module.png_to_framebuffer(
+            png_path, output, width, height, stride, format
+        )
+    if tool == "vid2fb":
+        frame = inputs.video_frame()
+        return lambda: module.write_frame(
+            0,
+            module.convert_frame(frame, width, height, stride, format, False),
+            output,
+        )
+    if tool == "txt2fb":
+        return lambda: module.text_to_framebuffer(
+            BENCH_TEXT, output, width, height, stride, format, text_x=10, text_y=10
+        )
+    if tool == "fbfill":
+        return lambda: module.fill_framebuffer(
+            "#3366cc", width, height, stride, output, format
+        )
+    if tool == "fb2img":
+        fb_path = inputs.framebuffer(resolution, format, stride)
+        return lambda: module.framebuffer_to_png(
+            fb_path, output, width, height, format, stride
+        )
+    raise ValueError(f"Unknown tool: {tool}")
+
+
+def measure(run, repeat):
+    # Median wall time over `repeat` runs, then one more run under tracemalloc
+    # for the peak memory (kept out of the timings because of its overhead)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run()  # warm up caches, fonts and imports
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        # With --tracemalloc the whole run is already traced, so only reset
+        # the peak and leave tracing on for the final report. Python 3.8 has
+        # no reset_peak, there the peak since tracing started is an upper bound.
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def run_benchmarks(tools, resolutions, formats, strides, repeat=3):
+    modules = {}
+    for tool in tools:
+        try:
+            modules[tool] = load_tool(tool)
+        except ImportError as e:
+            print(f"Skipping {tool}: {e}")
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        inputs = Inputs(folder)
+        for tool in modules:
+            # vid2fb writes into a folder, the others write a file
+            if tool == "vid2fb":
+                output = os.path.join(folder, "frames")
+                os.makedirs(output, exist_ok=True)
+            elif tool == "fb2img":
+                output = os.path.join(folder, "output.png")
+            else:
+                output = os.path.join(folder, "output.bin")
+            for resolution in resolutions:
+                width, height = RESOLUTIONS[resolution]
+                for format in formats:
+                    for stride_kind in strides:
+                        stride = calculate_stride(width, format)
+                        if stride_kind == "padded":
+                            stride += STRIDE_PADDING
+                        case = f"{tool}/{resolution}/{format}/{stride_kind}"
+                        run = make_case(
+                            modules, inputs, tool, resolution, format, stride, output
+                        )
+                        seconds, peak = measure(run, repeat)
+                        frame_bytes = height * stride
+                        results[case] = {
+                            "seconds": seconds,
+                            "peak_bytes": peak,
+                            "mb_per_s": frame_bytes / seconds / 1e6,
+                        }
+                        print(
+                            f"{case:<36} {seconds * 1000:9.2f} ms {peak / 1e6:9.1f} MB peak "
+                            f"{results[case]['mb_per_s']:9.1f} MB/s"
+                        )
+    return results
+
+
+def worker_counts():
+    # 1, 2, 4, ... up to the number of CPUs
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def synthetic_video(path, frames):
+    # MJPEG video of the synthetic image scrolling sideways, so every frame
+    # differs
+    import cv2
+
+    width, height = VIDEO_SOURCE_SIZE
+    image = np.ascontiguousarray(synthetic_image(width, height)[:, :, :3])
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    for i in range(frames):
+        writer.write(np.roll(image, i * 8, axis=1))
+    writer.release()
+
+
+def time_video(vid2fb, video, width, height, format, **kwargs):
+    # Seconds taken to convert the video, streaming the frames to /dev/null
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        vid2fb.video_to_framebuffer(
+            video, os.devnull, width, height, format=format, stream=True, **kwargs
+        )
+        return time.perf_counter() - start
+
+
+def run_scaling(resolutions, formats, workers, frames=SCALING_FRAMES):
+    # Converts a generated video with vid2fb using threads and worker processes
+    # for every worker count, streaming the output to /dev/null, and reports
+    # the frame rate and the speedup over one worker
+    vid2fb = load_tool("vid2fb")
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        video = os.path.join(folder, "input.avi")
+        synthetic_video(video, frames)
+        for resolution in resolutions:
+            width, height = RESOLUTIONS[resolution]
+            for format in formats:
+                for mode in SCALING_MODES:
+                    single = None
+                    for count in workers:
+                        if mode == "processes":
+                            kwargs = {"processes": count}
+                        else:
+                            kwargs = {"workers": count}
+                        seconds = time_video(
+                            vid2fb, video, width, height, format, **kwargs
+                        )
+                        frames_per_s = frames / seconds
+                        single = single or frames_per_s
+                        case = f"scaling/{resolution}/{format}/{mode}/{count}"
+                        results[case] = {
+                            "seconds": seconds / frames,
+                            "peak_bytes": 0,
+                            "frames_per_s": frames_per_s,
+                        }
+                        print(
+                            f"{case:<40} {frames_per_s:9.1f} frames/s {frames_per_s / single:6.2f}x"
+                        )
+    return results
+
+
+def environment():
+    import PIL
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    # Returns the list of regressions: cases that got slower or used more
+    # memory than the baseline by more than `threshold` (0.2 = 20%)
+    regressions = []
+    for case, result in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        for key, label in (("seconds", "time"), ("peak_bytes", "peak memory")):
+            if base[key] and result[key] > base[key] * (1 + threshold):
+                change = result[key] / base[key] - 1
+                regressions.append(f"{case}: {label} +{change:.0%}")
+    return regressions
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Benchmark the fbutil converters on generated inputs"
+    )
+    parser.add_argument(
+        "--tools", nargs="+", default=TOOLS, choices=TOOLS, help="Tools to benchmark."
+    )
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        choices=list(RESOLUTIONS),
+        help="Screen sizes to benchmark (default: all, 1080p with --scaling).",
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=FORMATS,
+        help="Framebuffer formats to benchmark (default: all, RGB565 with --scaling).",
+    )
+    parser.add_argument(
+        "--strides",
+        nargs="+",
+        default=STRIDES,
+        choices=STRIDES,
+        help=f"Unpadded rows, or rows padded by {STRIDE_PADDING} bytes.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed runs per case, the median is reported (default: 3).",
+    )
+    parser.add_argument(
+        "--output", type=str, help="Write the results to this JSON file."
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        help="Compare against a JSON file written by --output and exit with status 1 on regressions.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown or memory growth over the baseline (default: 0.25 = 25%%).",
+    )
+    parser.add_argument(
+        "--scaling",
+        action="store_true",
+        help="Instead of the converter matrix, measure how vid2fb's frame rate scales with the number of worker threads and processes.",
+    )
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=int,
+        help="Worker counts for --scaling (default: 1, 2, 4, ... up to the number of CPUs).",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=SCALING_FRAMES,
+        help=f"Length of the generated video for --scaling (default: {SCALING_FRAMES}).",
+    )
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    start_stats(args)
+
+    if args.scaling:
+        results = run_scaling(
+            args.resolutions or ["1080p"],
+            args.formats or ["RGB565"],
+            args.workers or worker_counts(),
+            args.frames,
+        )
+    else:
+        results = run_benchmarks(
+            args.tools,
+            args.resolutions or list(RESOLUTIONS),
+            args.formats or FORMATS,
+            args.strides,
+            args.repeat,
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=4)
+        print(f"Results saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != environment():
+            print("WARNING: The baseline was recorded in a different environment.")
+        regressions = compare(results, baseline["results"], args.threshold)
+        missing = len(set(results) - set(baseline["results"]))
+        if missing:
+            print(f"{missing} cases are not in the baseline")
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
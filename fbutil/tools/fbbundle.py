@@ -0,0 +1,146 @@
+import argparse
+import time
+
+import numpy as np
+
+from fbutil.bundle import (
+    DEFAULT_LINK_SPEED,
+    BundleWriter,
+    bundle_report,
+    is_bundle,
+    read_bundle,
+)
+from fbutil.delta import apply_delta
+from fbutil.timing import add_stats_arguments, start_stats, stats
+from fbutil.tools.fbplay import open_frames
+
+
+def source_frames(source):
+    # Yields every full frame of a vid2fb frame folder or container
+    frames = open_frames(source)
+    shadow = None
+    if frames.delta:
+        # Deltas are replayed onto one frame in order, rather than rendering
+        # every frame again from its keyframe
+        shadow = np.zeros((frames.height, frames.stride), dtype=np.uint8)
+    try:
+        for frame_index in range(len(frames)):
+            if shadow is not None:
+                apply_delta(frames.frame(frame_index), shadow)
+                yield shadow.copy()
+            else:
+                # Container frames are views of its mapping, which has to be
+                # closable while the caller still holds the last frame
+                yield np.array(frames.frame(frame_index))
+    finally:
+        frames.close()
+
+
+def bundle_frames(
+    source,
+    bundle_path,
+    compress_level=6,
+    chunk_frames=1,
+    link_speed=DEFAULT_LINK_SPEED,
+):
+    start = time.perf_counter()
+    with BundleWriter(bundle_path, compress_level, chunk_frames) as writer:
+        for frame in source_frames(source):
+            with stats.timer("compress"):
+                writer.write_frame(frame)
+            stats.count("frames")
+    return bundle_report(
+        writer.raw_bytes,
+        writer.compressed_bytes,
+        writer.frames,
+        time.perf_counter() - start,
+        link_speed,
+    )
+
+
+def verify_bundle(bundle_path, source):
+    # Decompresses the bundle and compares it byte for byte with the frames it
+    # was made from. Returns the number of frames compared.
+    expected = source_frames(source)
+    count = 0
+    for count, frame in enumerate(read_bundle(bundle_path), 1):
+        original = next(expected, None)
+        if original is None:
+            raise ValueError(f"{bundle_path} has more frames than {source}")
+        if frame != memoryview(original).cast("B"):
+            raise ValueError(
+                f"Frame {count - 1} of {bundle_path} differs from {source}"
+            )
+    if next(expected, None) is not None:
+        raise ValueError(f"{bundle_path} has fewer frames than {source}")
+    return count
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Compress vid2fb output into a bundle for pushing to a device",
+    )
+    parser.add_argument(
+        "source", type=str, help="vid2fb output folder or container file."
+    )
+    parser.add_argument(
+        "bundle",
+        type=str,
+        help="Bundle to write: .tar.gz for frame files, .gz for gzip chunks with a .idx file.",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=6,
+        choices=range(1, 10),
+        metavar="1-9",
+        help="gzip compression level (default: 6).",
+    )
+    parser.add_argument(
+        "--chunk-frames",
+        type=int,
+        default=1,
+        help="Frames per independently decompressible gzip chunk in a .gz bundle, 0 for a single chunk (default: 1).",
+    )
+    parser.add_argument(
+        "--link-speed",
+        type=float,
+        default=DEFAULT_LINK_SPEED,
+        help=f"Transfer speed in MB/s used for the push time estimate (default: {DEFAULT_LINK_SPEED:g}).",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Decompress the bundle afterwards and compare it with the source.",
+    )
+    parser.add_argument(
+        "--verify-only",
+        action="store_true",
+        help="Only compare an existing bundle with the source.",
+    )
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    if not is_bundle(args.bundle):
+        parser.error("the bundle name must end in .tar.gz, .tgz or .gz")
+    start_stats(args)
+
+    if not args.verify_only:
+        bundle_frames(
+            args.source,
+            args.bundle,
+            args.compress_level,
+            args.chunk_frames,
+            args.link_speed,
+        )
+    if args.verify or args.verify_only:
+        try:
+            count = verify_bundle(args.bundle, args.source)
+        except ValueError as e:
+            print(f"Verification failed: {e}")
+            raise SystemExit(1)
+        print(f"Verified {count} frames of {args.bundle} against {args.source}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import struct
+import numpy as np
+
+from fbutil.fbio import FramebufferRegion, clip_rect, parse_rect
+from fbutil.formats import (
+    FORMATS,
+    allocate_framebuffer,
+    bytes_per_pixel,
+    calculate_stride,
+    encode,
+    pixel_view,
+)
+from fbutil.profile import add_profile_arguments, apply_profile
+from fbutil.stream import (
+    CHUNK_SIZE,
+    is_stream_target,
+    open_stream,
+    reserve_stdout,
+)
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+
+def fill_framebuffer(hex_color, width, height, stride, framebuffer, format, rect=None):
+    # Convert hex color to RGB
+    if hex_color.startswith("#"):
+        hex_color = hex_color[1:]
+    r, g, b = struct.unpack("BBB", bytes.fromhex(hex_color))
+
+    # Encode a single pixel and broadcast it over the visible part of every row
+    pixel = encode(np.array([[[r, g, b]]], dtype=np.uint8), format, force_alpha=True)
+    stats.count("frames")
+
+    if rect is not None:
+        # Paint just the rectangle of the existing framebuffer
+        clipped = clip_rect(rect, width, height)
+        if clipped is None:
+            print(f"Rectangle {rect} is outside the {width}x{height} screen")
+            return
+        x, y, w, h = clipped
+        with stats.timer("write"), FramebufferRegion(
+            framebuffer, clipped, stride, bytes_per_pixel(format)
+        ) as region:
+            region.pixels[:] = np.tile(pixel[0], w)
+        print(
+            f"Filled {w}x{h} at {x},{y} of framebuffer {framebuffer} with hex color {hex_color} in format {format}"
+        )
+        return
+
+    # Every row is the same, so encode one and write it over and over
+    # instead of building the whole frame
+    row = allocate_framebuffer(1, stride)
+    pixel_view(row, width, 1, stride, format)[:] = pixel[0]
+    block = np.tile(row, (max(1, min(height, CHUNK_SIZE // stride)), 1))
+    with stats.timer("write"), open_stream(framebuffer) as stream:
+        for start in range(0, height, len(block)):
+            stream.write(block[: height - start])
+
+    print(
+        f"Created framebuffer {framebuffer} with hex color {hex_color} (width: {width}, height: {height}, stride: {stride}) in format {format}"
+    )
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Creates an Android Framebuffer with a solid color"
+    )
+    parser.add_argument(
+        "--color", type=str, required=True, help="Hex color code (e.g., #FF5733)"
+    )
+    parser.add_argument(
+        "--width", type=int, help="Screen width in pixels (or use --profile)"
+    )
+    parser.add_argument(
+        "--height", type=int, help="Screen height in pixels (or use --profile)"
+    )
+    parser.add_argument(
+        "--stride",
+        type=int,
+        help="Framebuffer stride in bytes (calculated if not provided)",
+    )
+    parser.add_argument(
+        "--framebuffer",
+        required=True,
+        help="Output Framebuffer, - for stdout or tcp:HOST:PORT",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Framebuffer format (or use --profile)",
+    )
+    parser.add_argument(
+        "--rect",
+        type=parse_rect,
+        help="Only paint the X,Y,WIDTH,HEIGHT rectangle of an existing framebuffer file or device, in place",
+    )
+
+    add_profile_arguments(parser)
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_profile(
+        parser,
+        args,
+        default_format=None,
+        required=("width", "height", "format"),
+        formats=FORMATS,
+    )
+    start_stats(args)
+    if args.rect is not None and is_stream_target(args.framebuffer):
+        parser.error("--rect needs an existing framebuffer file or device")
+    if args.framebuffer == "-":
+        reserve_stdout()
+
+    if args.stride is None:
+        args.stride = calculate_stride(args.width, args.format)
+
+    fill_framebuffer(
+        args.color,
+        args.width,
+        args.height,
+        args.stride,
+        args.framebuffer,
+        args.format,
+        args.rect,
+    )
+
+
+if __name__ == "__main__":
+    main()
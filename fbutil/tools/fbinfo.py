@@ -0,0 +1,341 @@
+import atexit
+import re
+import logging
+import argparse
+
+from fbutil.profile import (
+    DEFAULT_PROFILE_PATH,
+    StaleProfileError,
+    fingerprint,
+    load_profile,
+    save_profile,
+)
+from fbutil.session import ShellSession
+from fbutil.timing import add_stats_arguments, start_stats
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Long-lived shells keyed by (local, as_root)
+sessions = {}
+
+SYSFS_FILES = ["bits_per_pixel", "virtual_size", "stride", "mode"]
+MARKER = "@@fbutil:"
+
+# Everything fbinfo needs, gathered in one shell session. Each value is printed
+# after a MARKER line so the output can be split back into sections.
+PROBE_SCRIPT = f"""
+echo "{MARKER}serial"; getprop ro.serialno 2>/dev/null
+echo "{MARKER}proc_fb"; cat /proc/fb
+read fb_id fb_driver < /proc/fb
+for f in {" ".join(SYSFS_FILES)}; do
+    echo "{MARKER}$f"; cat /sys/class/graphics/fb$fb_id/$f
+done
+echo "{MARKER}fb_location"
+if [ -e /dev/graphics/fb$fb_id ]; then
+    echo /dev/graphics/fb$fb_id
+elif [ -e /dev/fb$fb_id ]; then
+    echo /dev/fb$fb_id
+else
+    echo Unknown
+fi
+echo "{MARKER}wm_size"; wm size 2>/dev/null
+"""
+
+
+def get_session(as_root=False, local=False):
+    # One long-lived shell per mode and privilege level, shared by every
+    # command
+    key = (local, as_root)
+    if key not in sessions:
+        shell = "su" if as_root else "sh"
+        command = [shell] if local else ["adb", "shell", shell]
+        sessions[key] = ShellSession(command)
+    return sessions[key]
+
+
+def close_sessions():
+    for session in sessions.values():
+        session.close()
+    sessions.clear()
+
+
+def run_script(script, as_root=False, local=False):
+    # Multi-line scripts run in the same session, so a whole probe costs one
+    # round-trip
+    session = get_session(as_root, local)
+    result = session.run(script)
+    logging.debug(f"Running script with: {' '.join(session.command)}")
+    logging.debug(f"Script output: {result.stdout}")
+    logging.debug(f"Script error: {result.stderr}")
+    return result
+
+
+def split_sections(output):
+    sections = {}
+    name = None
+    for line in output.splitlines():
+        if line.startswith(MARKER):
+            name = line[len(MARKER) :].strip()
+            sections[name] = []
+        elif name is not None:
+            sections[name].append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items()}
+
+
+def probe_device(local=False):
+    result = run_script(PROBE_SCRIPT, as_root=True, local=local)
+    if result.stderr.strip():
+        logging.debug(f"Probe errors: {result.stderr}")
+    sections = split_sections(result.stdout)
+    if not sections:
+        logging.error(f"Error probing the device: {result.stderr}")
+    return sections
+
+
+def get_framebuffer_id_and_driver(proc_fb):
+    framebuffer_lines = proc_fb.strip().split("\n")
+    if not framebuffer_lines or not framebuffer_lines[0]:
+        logging.error("No framebuffer devices found")
+        return None, None
+
+    match = re.match(r"(\d+)\s+(\w+)", framebuffer_lines[0])
+    if not match:
+        logging.error("Unable to parse framebuffer information")
+        return None, None
+
+    framebuffer_id = match.group(1)
+    framebuffer_driver = match.group(2)
+
+    return framebuffer_id, framebuffer_driver
+
+
+def get_framebuffer_info(sections):
+    framebuffer_info = {}
+
+    for info_file in SYSFS_FILES:
+        value = sections.get(info_file, "")
+        if not value:
+            logging.error(f"Error accessing {info_file}")
+            continue
+
+        framebuffer_info[info_file] = value
+
+    framebuffer_info["fb_location"] = sections.get("fb_location") or "Unknown"
+
+    return framebuffer_info
+
+
+def parse_virtual_size(virtual_size_str):
+    # Attempt to handle different formats
+    virtual_size_str = virtual_size_str.replace(",", " ").strip()
+    dimensions = virtual_size_str.split()
+
+    if len(dimensions) == 2:
+        try:
+            width = int(dimensions[0])
+            height = int(dimensions[1])
+            return width, height
+        except ValueError:
+            logging.error("Error parsing virtual size dimensions")
+            return 0, 0
+    else:
+        logging.error("Unexpected virtual size format")
+        return 0, 0
+
+
+def get_physical_size(wm_size):
+    match = re.match(r"Physical size: (\d+)x(\d+)", wm_size.strip())
+    if not match:
+        logging.error("Unable to parse wm size information")
+        return None
+
+    width = match.group(1)
+    height = match.group(2)
+
+    return width, height
+
+
+def get_pixel_format(bits_per_pixel):
+    if bits_per_pixel == 32:
+        return "ARGB8888"
+    elif bits_per_pixel == 24:
+        return "RGB888"
+    elif bits_per_pixel == 16:
+        return "RGB565"
+    elif bits_per_pixel == 15:
+        return "ARGB1555"  # 1-bit alpha
+    elif bits_per_pixel == 12:
+        return "RGB444"  # 4 bits per channel
+    elif bits_per_pixel == 8:
+        return "RGB332"  # 3 bits red, 3 bits green, 2 bits blue
+    else:
+        return "Unknown"
+
+
+def parse_and_display_info(framebuffer_info, physical_size):
+    try:
+        bits_per_pixel = int(framebuffer_info.get("bits_per_pixel", 0))
+        virtual_size_str = framebuffer_info.get("virtual_size", "0 0")
+        stride = int(framebuffer_info.get("stride", 0))
+        mode = framebuffer_info.get("mode", "Unknown")
+        fb_location = framebuffer_info.get("fb_location", "Unknown")
+
+        width, height = parse_virtual_size(virtual_size_str)
+
+        pixel_format = get_pixel_format(bits_per_pixel)
+
+        logging.info(f"Framebuffer Width: {width}")
+        logging.info(f"Framebuffer Height: {height}")
+        logging.info(f"Framebuffer Location: {fb_location}")
+        logging.info(f"Bits per Pixel: {bits_per_pixel}")
+        logging.info(f"Stride: {stride}")
+        logging.info(f"Mode: {mode}")
+        logging.info(f"Pixel Format: {pixel_format}")
+
+        if physical_size:
+            logging.info(f"Physical Size: {physical_size[0]}x{physical_size[1]}")
+
+    except Exception as e:
+        logging.error(f"Error parsing framebuffer information: {str(e)}")
+
+
+def build_profile(
+    serial, framebuffer_id, framebuffer_driver, framebuffer_info, physical_size
+):
+    # Machine-readable summary the converters load with --profile
+    bits_per_pixel = int(framebuffer_info.get("bits_per_pixel", 0) or 0)
+    virtual_width, virtual_height = parse_virtual_size(
+        framebuffer_info.get("virtual_size", "0 0")
+    )
+    mode = framebuffer_info.get("mode", "")
+    # The visible resolution comes from the mode (e.g. "U:1080x2400p-60"), the
+    # virtual size can be several pages tall
+    match = re.search(r"(\d+)x(\d+)", mode)
+    width, height = (
+        (int(match.group(1)), int(match.group(2)))
+        if match
+        else (virtual_width, virtual_height)
+    )
+    return {
+        "serial": serial,
+        "fingerprint": fingerprint(framebuffer_info),
+        "framebuffer_id": framebuffer_id,
+        "driver": framebuffer_driver,
+        "fb_location": framebuffer_info.get("fb_location", "Unknown"),
+        "bits_per_pixel": bits_per_pixel,
+        "format": get_pixel_format(bits_per_pixel),
+        "width": width,
+        "height": height,
+        "virtual_width": virtual_width,
+        "virtual_height": virtual_height,
+        "stride": int(framebuffer_info.get("stride", 0) or 0) or None,
+        "mode": mode,
+        "physical_size": [int(v) for v in physical_size] if physical_size else None,
+    }
+
+
+def display_profile(profile):
+    logging.info(f"Device: {profile['serial']} (profile {profile['fingerprint']})")
+    logging.info(f"Framebuffer ID: {profile['framebuffer_id']}")
+    logging.info(f"Framebuffer Driver: {profile['driver']}")
+    parse_and_display_info(
+        {
+            "bits_per_pixel": profile["bits_per_pixel"],
+            "virtual_size": f"{profile['virtual_width']},{profile['virtual_height']}",
+            "stride": profile["stride"] or 0,
+            "mode": profile["mode"],
+            "fb_location": profile["fb_location"],
+        },
+        profile["physical_size"],
+    )
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Gets the device's framebuffer information"
+    )
+    parser.add_argument(
+        "-l",
+        "--local",
+        type=bool,
+        default=False,
+        help="Use local device instead of adb",
+    )
+    parser.add_argument(
+        "--profile-path",
+        type=str,
+        default=DEFAULT_PROFILE_PATH,
+        help=f"Where to save the device profile (default: {DEFAULT_PROFILE_PATH}).",
+    )
+    parser.add_argument(
+        "--no-save",
+        action="store_true",
+        help="Do not save the device profile.",
+    )
+    parser.add_argument(
+        "--cached",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="SERIAL",
+        help="Show the saved profile instead of probing the device.",
+    )
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    start_stats(args)
+    # Registered once, however often main runs in the same process
+    atexit.unregister(close_sessions)
+    atexit.register(close_sessions)
+
+    if args.cached is not None:
+        try:
+            display_profile(load_profile(args.profile_path, args.cached or None))
+        except ValueError as e:
+            logging.error(str(e))
+        return
+
+    sections = probe_device(args.local)
+    framebuffer_id, framebuffer_driver = get_framebuffer_id_and_driver(
+        sections.get("proc_fb", "")
+    )
+    if framebuffer_id is None:
+        return
+
+    logging.info(f"Framebuffer ID: {framebuffer_id}")
+    logging.info(f"Framebuffer Driver: {framebuffer_driver}")
+
+    framebuffer_info = get_framebuffer_info(sections)
+    if framebuffer_info:
+        logging.debug(f"Framebuffer info: {framebuffer_info}")
+        physical_size = get_physical_size(sections.get("wm_size", ""))
+        parse_and_display_info(framebuffer_info, physical_size)
+    else:
+        logging.error("Error getting framebuffer info")
+        return
+
+    if not args.no_save:
+        # Profiles are always named by ro.serialno, which load_profile and
+        # --profile SERIAL look up
+        serial = sections.get("serial") or "local"
+        profile = build_profile(
+            serial,
+            framebuffer_id,
+            framebuffer_driver,
+            framebuffer_info,
+            physical_size,
+        )
+        try:
+            load_profile(args.profile_path, serial, profile["fingerprint"])
+        except StaleProfileError as e:
+            logging.warning(f"{e}, replacing it")
+        except ValueError:
+            pass
+        save_profile(profile, args.profile_path)
+        logging.info(f"Device profile saved to {args.profile_path}")
+
+
+if __name__ == "__main__":
+    main()
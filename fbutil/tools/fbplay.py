@@ -0,0 +1,326 @@
+import argparse
+import os
+import stat
+import time
+import numpy as np
+
+from fbutil.container import FrameContainer, is_container
+from fbutil.delta import apply_delta
+from fbutil.fbio import map_framebuffer, pan_display
+from fbutil.profile import add_profile_arguments, apply_profile
+from fbutil.stream import open_stream_reader, read_exact_into
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+
+class FolderFrames:
+    # vid2fb output folder of 0.bin, 1.bin, ... with the same interface as
+    # FrameContainer
+    delta = False
+    fps = 0
+
+    def __init__(self, folder, height=None, stride=None):
+        self.folder = folder
+        count = 0
+        while os.path.exists(self.path(count)):
+            count += 1
+        if count == 0:
+            raise ValueError(f"No framebuffer files found in {folder}")
+        self.count = count
+        frame_size = os.path.getsize(self.path(0))
+        if stride is None and height is None:
+            # Without the geometry the whole file is treated as one long row
+            height, stride = 1, frame_size
+        elif stride is None:
+            stride = frame_size // height
+        elif height is None:
+            height = frame_size // stride
+        self.height = height
+        self.stride = stride
+
+    def path(self, frame_index):
+        return os.path.join(self.folder, f"{frame_index}.bin")
+
+    def __len__(self):
+        return self.count
+
+    def frame(self, frame_index):
+        return np.fromfile(self.path(frame_index), dtype=np.uint8)
+
+    def close(self):
+        pass
+
+
+def open_frames(source, height=None, stride=None):
+    if is_container(source):
+        return FrameContainer(source)
+    return FolderFrames(source, height, stride)
+
+
+def play(
+    source,
+    framebuffer,
+    fps=None,
+    loop=False,
+    page_flip=False,
+    height=None,
+    stride=None,
+    max_frames=None,
+):
+    frames = open_frames(source, height, stride)
+    height, stride = frames.height, frames.stride
+    if fps is None:
+        fps = frames.fps or 30
+    interval = 1 / fps if fps else 0
+
+    mm, fb_pages, fd = map_pages(framebuffer, height, stride, page_flip)
+    pages = len(fb_pages)
+    visible_page = 0
+    # Deltas apply to the previous frame, which is on the other page when
+    # flipping, so they are replayed into a shadow frame first
+    shadow = (
+        np.zeros((height, stride), dtype=np.uint8)
+        if frames.delta and page_flip
+        else None
+    )
+
+    shown = late = dropped = 0
+    frame = None
+    first_shown = last_shown = 0
+    frame_index = 0
+    tick = 0
+    start = time.perf_counter()
+    try:
+        while max_frames is None or shown < max_frames:
+            if frame_index >= len(frames):
+                if not loop:
+                    break
+                frame_index = 0
+
+            # Deadlines are measured from the start so sleep overshoot does
+            # not accumulate into drift
+            deadline = start + tick * interval
+            now = time.perf_counter()
+            if interval and now - deadline >= interval and not frames.delta:
+                # More than a frame behind: skip ahead instead of falling further
+                # behind. Deltas depend on every previous frame and are never
+                # skipped.
+                skip = min(int((now - deadline) / interval), len(frames) - frame_index)
+                dropped += skip
+                stats.count("dropped", skip)
+                tick += skip
+                frame_index += skip
+                continue
+            if now < deadline:
+                time.sleep(deadline - now)
+            elif interval and now - deadline > interval / 2:
+                late += 1
+                stats.count("late")
+
+            target = (visible_page + 1) % pages
+            with stats.timer("read"):
+                frame = frames.frame(frame_index)
+            with stats.timer("blit"):
+                if frames.delta and shadow is not None:
+                    apply_delta(frame, shadow)
+                    fb_pages[target][:] = shadow
+                elif frames.delta:
+                    apply_delta(frame, fb_pages[target])
+                else:
+                    fb_pages[target][:] = frame.reshape((height, stride))
+            stats.count("frames")
+            if page_flip:
+                pan_display(fd, target * height)
+                visible_page = target
+
+            last_shown = time.perf_counter()
+            if shown == 0:
+                first_shown = last_shown
+            shown += 1
+            tick += 1
+            frame_index += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        del fb_pages, frame
+        unmap_pages(mm, fd)
+        frames.close()
+
+    return report(shown, late, dropped, elapsed, first_shown, last_shown, fps)
+
+
+def play_stream(
+    source,
+    framebuffer,
+    height,
+    stride,
+    fps=0,
+    page_flip=False,
+    max_frames=None,
+):
+    # Plays raw frames as they arrive from vid2fb --stream. Each frame is read
+    # straight into the page it is displayed from, so nothing is buffered.
+    interval = 1 / fps if fps else 0
+    reader = open_stream_reader(source)
+    mm, fb_pages, fd = map_pages(framebuffer, height, stride, page_flip)
+    pages = len(fb_pages)
+    visible_page = 0
+
+    shown = late = 0
+    first_shown = last_shown = 0
+    start = time.perf_counter()
+    try:
+        while max_frames is None or shown < max_frames:
+            target = (visible_page + 1) % pages
+            with stats.timer("read"):
+                if not read_exact_into(reader, fb_pages[target]):
+                    break
+            stats.count("frames")
+
+            deadline = start + shown * interval
+            now = time.perf_counter()
+            if now < deadline:
+                time.sleep(deadline - now)
+            elif interval and now - deadline > interval / 2:
+                late += 1
+                stats.count("late")
+            if page_flip:
+                pan_display(fd, target * height)
+                visible_page = target
+
+            last_shown = time.perf_counter()
+            if shown == 0:
+                first_shown = last_shown
+                # Pace from the first frame, not from when the reader started
+                start = last_shown
+            shown += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        del fb_pages
+        unmap_pages(mm, fd)
+        reader.close()
+
+    return report(shown, late, 0, elapsed, first_shown, last_shown, fps)
+
+
+def map_pages(framebuffer, height, stride, page_flip):
+    # Map the visible page, plus the off-screen page when page flipping
+    pages = 2 if page_flip else 1
+    mm, fb_view = map_framebuffer(framebuffer, 0, pages * height * stride, write=True)
+    fd = os.open(framebuffer, os.O_RDWR) if page_flip else None
+    if page_flip and not pan_display(fd, 0):
+        print(f"{framebuffer} does not support panning, writing pages without flipping")
+    return mm, fb_view.reshape((pages, height, stride)), fd
+
+
+def unmap_pages(mm, fd):
+    mm.close()
+    if fd is not None:
+        os.close(fd)
+
+
+def report(shown, late, dropped, elapsed, first_shown, last_shown, fps):
+    # Rate over the intervals between displayed frames
+    achieved = (shown - 1) / (last_shown - first_shown) if shown > 1 else 0
+    print(
+        f"Played {shown} frames in {elapsed:.2f}s ({achieved:.2f} fps, target {fps:g}), "
+        f"{late} late, {dropped} dropped"
+    )
+    return {"frames": shown, "fps": achieved, "late": late, "dropped": dropped}
+
+
+def is_stream_source(source):
+    if source == "-" or source.startswith("tcp:"):
+        return True
+    return os.path.exists(source) and stat.S_ISFIFO(os.stat(source).st_mode)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Play vid2fb output on an Android framebuffer"
+    )
+    parser.add_argument(
+        "source",
+        type=str,
+        help="vid2fb output folder, container file, or stream (- for stdin, tcp:HOST:PORT, or a named pipe).",
+    )
+    parser.add_argument(
+        "framebuffer",
+        type=str,
+        help="Framebuffer device (e.g. /dev/graphics/fb0) or a file standing in for it.",
+    )
+    parser.add_argument(
+        "--fps",
+        type=float,
+        default=None,
+        help="Frames per second, 0 for as fast as possible (default: container fps or 30).",
+    )
+    parser.add_argument(
+        "--loop", action="store_true", help="Restart from the first frame at the end."
+    )
+    parser.add_argument(
+        "--page-flip",
+        action="store_true",
+        help="Draw into the off-screen page of the virtual framebuffer and pan to it.",
+    )
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=None,
+        help="Height of the screen, needed for streams and for --page-flip with a frame folder.",
+    )
+    parser.add_argument(
+        "--stride",
+        type=int,
+        default=None,
+        help="Stride of the framebuffer (default: frame size / height).",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=None,
+        help="Stop after this many frames (default: play to the end).",
+    )
+    add_profile_arguments(parser)
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    start_stats(args)
+    if args.profile is not None:
+        apply_profile(parser, args, default_format=None, required=())
+
+    if is_stream_source(args.source):
+        if args.height is None or args.stride is None:
+            parser.error("--height and --stride are required when playing a stream")
+        play_stream(
+            args.source,
+            args.framebuffer,
+            args.height,
+            args.stride,
+            args.fps or 0,
+            args.page_flip,
+            args.frames,
+        )
+        return
+
+    if args.page_flip and args.height is None and not is_container(args.source):
+        # A frame folder alone has no height, so the pages could not be found
+        parser.error(
+            "--height (or --profile) is required for --page-flip with a frame folder"
+        )
+
+    play(
+        args.source,
+        args.framebuffer,
+        args.fps,
+        args.loop,
+        args.page_flip,
+        args.height,
+        args.stride,
+        args.frames,
+    )
+
+
+if __name__ == "__main__":
+    main()
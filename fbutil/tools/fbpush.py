@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import posixpath
+import shlex
+import time
+
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+# Separates the checksums from the sizes in the remote listing
+LISTING_MARKER = "__fbutil_sizes__"
+
+
+def local_files(source):
+    # The files to push: every file of a folder (N.bin frames in frame order),
+    # or a single file plus the .idx of a .gz bundle
+    if os.path.isdir(source):
+        names = [
+            name
+            for name in os.listdir(source)
+            if os.path.isfile(os.path.join(source, name))
+        ]
+        names.sort(key=lambda name: (len(name), name))
+        return [os.path.join(source, name) for name in names]
+    files = [source]
+    if os.path.exists(source + ".idx"):
+        files.append(source + ".idx")
+    return files
+
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def adb_command(adb, serial, *args):
+    return [adb] + (["-s", serial] if serial else []) + list(args)
+
+
+async def run_adb(adb, serial, *args):
+    # Returns (returncode, stdout, stderr)
+    proc = await asyncio.create_subprocess_exec(
+        *adb_command(adb, serial, *args),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    return (
+        proc.returncode,
+        stdout.decode(errors="replace"),
+        stderr.decode(errors="replace"),
+    )
+
+
+def listing_command(remote_dir, size_only=False):
+    # One shell command creating remote_dir and listing the size and, unless
+    # size_only, the md5 of every file in it
+    find = "find . -maxdepth 1 -type f -exec {} {{}} +"
+    command = f"mkdir -p {shlex.quote(remote_dir)} && cd {shlex.quote(remote_dir)} && "
+    if not size_only:
+        command += find.format("md5sum") + "; "
+    command += f"echo {LISTING_MARKER}; " + find.format("stat -c '%s %n'")
+    return command
+
+
+def parse_listing(output):
+    # {name: (size, md5 or None)} from the output of listing_command
+    checksums, _, sizes = output.partition(LISTING_MARKER)
+    md5s = {}
+    for line in checksums.splitlines():
+        fields = line.split(None, 1)
+        if len(fields) == 2:
+            md5s[posixpath.basename(fields[1])] = fields[0]
+    files = {}
+    for line in sizes.splitlines():
+        fields = line.split(None, 1)
+        if len(fields) == 2 and fields[0].isdigit():
+            name = posixpath.basename(fields[1])
+            files[name] = (int(fields[0]), md5s.get(name))
+    return files
+
+
+class Progress:
+    # Aggregate transfer rate, printed at most once per interval
+    def __init__(self, files, total_bytes, interval=1.0):
+        self.files = files
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.done = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last_print = self.start
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.bytes / elapsed / 1e6 if elapsed else 0
+
+    def add(self, size):
+        self.done += 1
+        self.bytes += size
+        now = time.perf_counter()
+        if now - self.last_print >= self.interval or self.done == self.files:
+            self.last_print = now
+            print(
+                f"Pushed {self.done}/{self.files} files, "
+                f"{self.bytes / 1e6:.1f}/{self.total_bytes / 1e6:.1f} MB at {self.rate():.1f} MB/s"
+            )
+
+
+async def push_file(adb, serial, path, remote_path, retries, semaphore, progress):
+    # Returns None once the file is pushed, or the last error after retries
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            stats.count("retries")
+            await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+        async with semaphore:
+            returncode, stdout, stderr = await run_adb(
+                adb, serial, "push", path, remote_path
+            )
+        if returncode == 0:
+            size = os.path.getsize(path)
+            stats.count("files_pushed")
+            stats.count("bytes_pushed", size)
+            progress.add(size)
+            return None
+        error = (stderr or stdout).strip() or f"adb exited with {returncode}"
+    return error
+
+
+async def push_async(files, remote_dir, adb, serial, jobs, retries, size_only):
+    returncode, stdout, stderr = await run_adb(
+        adb, serial, "shell", listing_command(remote_dir, size_only)
+    )
+    if returncode != 0:
+        raise RuntimeError(f"Listing {remote_dir} on the device failed: {stderr}")
+    remote = parse_listing(stdout)
+    if remote and not size_only and all(md5 is None for _, md5 in remote.values()):
+        print("WARNING: The device did not list checksums, try --size-only")
+
+    # Files already on the device with the same size and checksum are skipped,
+    # so an interrupted push picks up where it stopped
+    todo = []
+    for path in files:
+        size = os.path.getsize(path)
+        present = remote.get(os.path.basename(path))
+        if present is not None and present[0] == size:
+            if size_only or present[1] == file_md5(path):
+                stats.count("files_skipped")
+                continue
+        todo.append(path)
+    skipped = len(files) - len(todo)
+    if skipped:
+        print(f"Skipping {skipped} files already on the device")
+
+    progress = Progress(len(todo), sum(os.path.getsize(path) for path in todo))
+    semaphore = asyncio.Semaphore(jobs)
+    errors = await asyncio.gather(
+        *(
+            push_file(
+                adb,
+                serial,
+                path,
+                posixpath.join(remote_dir, os.path.basename(path)),
+                retries,
+                semaphore,
+                progress,
+            )
+            for path in todo
+        )
+    )
+    failed = {path: error for path, error in zip(todo, errors) if error is not None}
+    return {
+        "pushed": len(todo) - len(failed),
+        "skipped": skipped,
+        "failed": failed,
+        "bytes": progress.bytes,
+        "seconds": time.perf_counter() - progress.start,
+        "mb_per_s": progress.rate(),
+    }
+
+
+def push_frames(
+    source,
+    remote_dir,
+    adb="adb",
+    serial=None,
+    jobs=4,
+    retries=3,
+    size_only=False,
+):
+    # Pushes a vid2fb frame folder (or a single file such as a container or
+    # bundle) into remote_dir with up to `jobs` adb pushes at once. Returns a
+    # summary with the files that still failed after the retries.
+    files = local_files(source)
+    result = asyncio.run(
+        push_async(files, remote_dir, adb, serial, jobs, retries, size_only)
+    )
+    print(
+        f"Pushed {result['pushed']} files ({result['bytes'] / 1e6:.1f} MB) in "
+        f"{result['seconds']:.1f}s at {result['mb_per_s']:.1f} MB/s, "
+        f"skipped {result['skipped']}, failed {len(result['failed'])}"
+    )
+    for path, error in result["failed"].items():
+        print(f"Failed to push {path}: {error}")
+    return result
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Push vid2fb output to a device, skipping files that are already there",
+    )
+    parser.add_argument(
+        "source",
+        type=str,
+        help="Folder of frames to push, or a single file (e.g. a container or bundle).",
+    )
+    parser.add_argument(
+        "remote_dir", type=str, help="Folder on the device, e.g. /sdcard/frames."
+    )
+    parser.add_argument(
+        "--adb",
+        type=str,
+        default=os.environ.get("ADB", "adb"),
+        help="adb binary to run (default: $ADB or adb).",
+    )
+    parser.add_argument(
+        "--serial",
+        "-s",
+        type=str,
+        default=None,
+        help="Serial of the device to push to (default: $ANDROID_SERIAL or the only device).",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=4,
+        help="Number of adb pushes running at once (default: 4).",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="Times a failed push is retried (default: 3).",
+    )
+    parser.add_argument(
+        "--size-only",
+        action="store_true",
+        help="Skip files already on the device by size alone, for devices without md5sum.",
+    )
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    start_stats(args)
+
+    try:
+        result = push_frames(
+            args.source,
+            args.remote_dir,
+            args.adb,
+            args.serial,
+            args.jobs,
+            args.retries,
+            args.size_only,
+        )
+    except (OSError, RuntimeError) as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+    if result["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import os
+import time
+
+from fbutil.fbio import FramebufferRegion
+from fbutil.formats import FORMATS
+from fbutil.profile import add_profile_arguments, apply_profile
+from fbutil.scene import Compositor, load_scene
+from fbutil.stream import (
+    is_stream_target,
+    open_stream,
+    reserve_stdout,
+    write_output,
+)
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+
+def write_rects(compositor, framebuffer_path, rects):
+    # Copies the rewritten rectangles of the composited frame into the
+    # existing framebuffer, leaving everything else untouched
+    bpp = compositor.bpp
+    stride = compositor.fb_arr.shape[1]
+    for x, y, w, h in rects:
+        with stats.timer("write"), FramebufferRegion(
+            framebuffer_path, (x, y, w, h), stride, bpp
+        ) as region:
+            region.pixels[:] = compositor.fb_arr[y : y + h, x * bpp : (x + w) * bpp]
+
+
+def compose_scene(
+    scene_path,
+    framebuffer_path,
+    width,
+    height,
+    stride=None,
+    format="RGB565",
+    force_alpha=False,
+    watch=False,
+    interval=0.5,
+):
+    compositor = Compositor(width, height, format, stride, force_alpha)
+    scene = load_scene(scene_path)
+    start = time.perf_counter()
+    compositor.render(scene["layers"])
+    print(
+        f"Composited {len(scene['layers'])} layers in {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+
+    stats.count("frames")
+
+    if not watch:
+        with stats.timer("write"):
+            write_output(framebuffer_path, compositor.fb_arr)
+        print(f"Framebuffer data saved to: {framebuffer_path}")
+        return
+
+    # Streams get every new frame in full; files and devices only get the
+    # rectangles that changed
+    stream = (
+        open_stream(framebuffer_path) if is_stream_target(framebuffer_path) else None
+    )
+    try:
+        if stream is not None:
+            stream.write(compositor.fb_arr)
+        else:
+            write_output(framebuffer_path, compositor.fb_arr)
+        print(f"Watching {scene_path} for changes")
+        mtime = os.path.getmtime(scene_path)
+        while True:
+            time.sleep(interval)
+            if os.path.getmtime(scene_path) == mtime:
+                # Image layers may have changed on disk without the scene
+                if not any(layer.get("type") == "image" for layer in scene["layers"]):
+                    continue
+            else:
+                mtime = os.path.getmtime(scene_path)
+                try:
+                    scene = load_scene(scene_path)
+                except ValueError as e:
+                    # Most likely caught halfway through being saved
+                    print(f"Skipping invalid scene: {e}")
+                    continue
+
+            start = time.perf_counter()
+            rects = compositor.render(scene["layers"])
+            if not rects:
+                continue
+            stats.count("frames")
+            if stream is not None:
+                stream.write(compositor.fb_arr)
+            else:
+                write_rects(compositor, framebuffer_path, rects)
+            print(
+                f"Updated {len(rects)} regions {rects} in {(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Composite fills, images and text into one Android framebuffer",
+    )
+    parser.add_argument(
+        "scene_path", type=str, help="Scene description (.json, or .yaml with PyYAML)."
+    )
+    parser.add_argument(
+        "framebuffer_path",
+        type=str,
+        help="Path to the output framebuffer binary file, - for stdout or tcp:HOST:PORT.",
+    )
+    parser.add_argument(
+        "width",
+        type=int,
+        nargs="?",
+        help="Width of the screen (or use --profile or the scene's width).",
+    )
+    parser.add_argument(
+        "height",
+        type=int,
+        nargs="?",
+        help="Height of the screen (or use --profile or the scene's height).",
+    )
+    parser.add_argument(
+        "--stride", type=int, help="Stride of the framebuffer (optional)."
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=None,
+        choices=FORMATS,
+        help="Framebuffer format (default: the scene's format or RGB565).",
+    )
+    parser.add_argument(
+        "--force-alpha",
+        action="store_true",
+        help="Force the alpha value to be 255.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and recomposite the regions of layers that change when the scene file is edited.",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="Seconds between checks for changes with --watch (default: 0.5).",
+    )
+    add_profile_arguments(parser)
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    start_stats(args)
+    apply_profile(parser, args, default_format=None, required=())
+
+    # The scene may carry the geometry too, the command line and profile win
+    try:
+        scene = load_scene(args.scene_path)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    for key in ("width", "height", "stride", "format"):
+        if getattr(args, key) is None:
+            setattr(args, key, scene.get(key))
+    apply_profile(parser, args, formats=FORMATS)
+
+    if args.framebuffer_path == "-":
+        reserve_stdout()
+
+    compose_scene(
+        args.scene_path,
+        args.framebuffer_path,
+        args.width,
+        args.height,
+        args.stride,
+        args.format,
+        args.force_alpha,
+        args.watch,
+        args.interval,
+    )
+
+
+if __name__ == "__main__":
+    main()
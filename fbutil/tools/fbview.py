@@ -0,0 +1,98 @@
+import argparse
+import statistics
+import sys
+import time
+
+from PIL import Image
+
+from fbutil.mirror import MirrorCanvas, read_header, read_updates
+from fbutil.stream import open_stream_reader
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+
+def view_mirror(source, output=None, window=False, quiet=False):
+    # Keeps a canvas of the mirrored screen up to date with the updates sent
+    # by fb2img --mirror, and reports the bytes and latency of each one. The
+    # latency is measured from when the framebuffer was read, so it includes
+    # any clock difference between the two machines.
+    if window:
+        import cv2
+
+    f = open_stream_reader(source)
+    width, height, channels = read_header(f)
+    print(f"Mirroring a {width}x{height} screen")
+    canvas = MirrorCanvas(width, height, channels)
+    sizes = []
+    latencies = []
+    try:
+        for captured, sequence, count, payload, size in read_updates(f):
+            with stats.timer("apply"):
+                canvas.apply(payload, count)
+            latency = time.time() - captured
+            sizes.append(size)
+            latencies.append(latency)
+            stats.count("frames")
+            stats.count("bytes_read", size)
+            stats.gauge("latency_ms", latency * 1000)
+            if not quiet:
+                print(
+                    f"Update {sequence}: {count} tiles, {size / 1e3:.1f} KB, "
+                    f"latency {latency * 1000:.1f} ms"
+                )
+            if window:
+                pixels = canvas.pixels
+                code = cv2.COLOR_RGBA2BGR if channels == 4 else cv2.COLOR_RGB2BGR
+                cv2.imshow("fbview", cv2.cvtColor(pixels, code))
+                if cv2.waitKey(1) == 27:
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+    if sizes:
+        print(
+            f"Received {len(sizes)} updates, {sum(sizes) / 1e3:.1f} KB "
+            f"({statistics.mean(sizes) / 1e3:.1f} KB per update), latency "
+            f"{statistics.median(latencies) * 1000:.1f} ms median, "
+            f"{max(latencies) * 1000:.1f} ms max"
+        )
+    if output:
+        mode = "RGBA" if channels == 4 else "RGB"
+        Image.fromarray(canvas.pixels, mode).save(output)
+        print(f"Last screen saved to: {output}")
+    return {"updates": len(sizes), "bytes": sum(sizes), "latencies": latencies}
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="View a screen mirrored by fb2img --mirror"
+    )
+    parser.add_argument(
+        "source",
+        type=str,
+        help="Where the updates come from: - for stdin, tcp:HOST:PORT to listen, or a pipe.",
+    )
+    parser.add_argument(
+        "--output", type=str, help="Save the last screen to this PNG image."
+    )
+    parser.add_argument(
+        "--window",
+        action="store_true",
+        help="Show the screen in a window (needs OpenCV with GUI support), Esc closes it.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only print the summary, not every update.",
+    )
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    start_stats(args)
+
+    view_mirror(args.source, args.output, args.window, args.quiet)
+
+
+if __name__ == "__main__":
+    main()
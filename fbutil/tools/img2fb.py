@@ -0,0 +1,162 @@
+import argparse
+from PIL import Image
+import numpy as np
+
+from fbutil.batch import expand_inputs, run_batch
+from fbutil.fbio import parse_rect, write_region
+from fbutil.formats import FORMATS, calculate_stride, encode, has_alpha
+from fbutil.profile import add_profile_arguments, apply_profile
+from fbutil.stream import is_stream_target, reserve_stdout, write_output
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+# Inputs picked up from a folder in --batch mode
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp"}
+
+
+def png_to_framebuffer(
+    png_path,
+    framebuffer_path,
+    width,
+    height,
+    stride=None,
+    format="RGB565",
+    force_alpha=False,
+    rect=None,
+):
+    if stride is None:
+        print(
+            "WARNING: No stride is provided. The stride will be calculated automatically but it may not be "
+            "accurate. Please run fbinfo to get the correct stride."
+        )
+        stride = calculate_stride(width, format)
+    print(f"Calculated stride: {stride}")
+
+    # Load the image
+    with stats.timer("decode"):
+        img = Image.open(png_path)
+        img.load()
+    # Resize image to the specified dimensions, or to the rectangle being
+    # updated in the existing framebuffer
+    with stats.timer("resize"):
+        img = img.resize((width, height) if rect is None else rect[2:])
+    with stats.timer("convert"):
+        img = img.convert("RGBA" if has_alpha(format) else "RGB")
+    stats.count("frames")
+
+    if rect is not None:
+        with stats.timer("write"):
+            written = write_region(
+                framebuffer_path,
+                np.asarray(img),
+                rect[0],
+                rect[1],
+                width,
+                height,
+                stride,
+                format,
+                force_alpha,
+            )
+        print(f"Updated region {written} of {framebuffer_path}")
+        return
+
+    with stats.timer("pack"):
+        fb_arr = encode(np.asarray(img), format, stride, force_alpha)
+
+    # Save the framebuffer data to a file
+    with stats.timer("write"):
+        write_output(framebuffer_path, fb_arr)
+    print("Framebuffer data saved to:", framebuffer_path)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Convert a PNG image to an Android framebuffer"
+    )
+    parser.add_argument("png_path", type=str, help="Path to the input PNG image.")
+    parser.add_argument(
+        "framebuffer_path",
+        type=str,
+        help="Path to the output framebuffer binary file, - for stdout or tcp:HOST:PORT.",
+    )
+    parser.add_argument(
+        "width", type=int, nargs="?", help="Width of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "height", type=int, nargs="?", help="Height of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "--stride", type=int, help="Stride of the framebuffer (optional)."
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=None,
+        choices=FORMATS,
+        help="Framebuffer format (default: RGB565).",
+    )
+    parser.add_argument(
+        "--force-alpha",
+        action="store_true",
+        help="Force the alpha value to be 255.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Convert every image matching png_path (a folder or a quoted glob) into the framebuffer_path folder.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes used by --batch (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--rect",
+        type=parse_rect,
+        help="Scale the image into the X,Y,WIDTH,HEIGHT rectangle of an existing framebuffer file or device and update it in place.",
+    )
+    add_profile_arguments(parser)
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_profile(parser, args, formats=FORMATS)
+    start_stats(args)
+    if args.rect is not None and (
+        args.batch or is_stream_target(args.framebuffer_path)
+    ):
+        parser.error("--rect needs a single existing framebuffer file or device")
+    if args.framebuffer_path == "-":
+        reserve_stdout()
+    print(f"Using format: {args.format}")
+    print(f"Force alpha: {args.force_alpha}")
+
+    if args.batch:
+        run_batch(
+            expand_inputs(args.png_path, IMAGE_EXTENSIONS),
+            args.framebuffer_path,
+            ".bin",
+            png_to_framebuffer,
+            {
+                "width": args.width,
+                "height": args.height,
+                "stride": args.stride,
+                "format": args.format,
+                "force_alpha": args.force_alpha,
+            },
+            args.jobs,
+        )
+        return
+
+    png_to_framebuffer(
+        args.png_path,
+        args.framebuffer_path,
+        args.width,
+        args.height,
+        args.stride,
+        args.format,
+        args.force_alpha,
+        args.rect,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import os
+import sys
+from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+
+from fbutil.fbio import map_framebuffer, parse_rect, write_region
+from fbutil.formats import (
+    FORMATS,
+    allocate_framebuffer,
+    bytes_per_pixel,
+    calculate_stride,
+    encode,
+    frame_size,
+    has_alpha,
+)
+from fbutil.glyphs import load_atlas
+from fbutil.profile import add_profile_arguments, apply_profile
+from fbutil.stream import is_stream_target, reserve_stdout, write_output
+from fbutil.timing import add_stats_arguments, start_stats, stats
+
+
+def text_to_framebuffer(
+    text,
+    framebuffer_path,
+    width,
+    height,
+    stride=None,
+    format="RGB565",
+    font_path=None,
+    font_size=8,
+    text_x=0,
+    text_y=0,
+    force_alpha=False,
+    rect=None,
+):
+    if stride is None:
+        stride = calculate_stride(width, format)
+    print(f"Calculated stride: {stride}")
+
+    # Create a blank image with the specified width and height, or the size of
+    # the rectangle being updated (text positions are then relative to it)
+    size = (width, height) if rect is None else rect[2:]
+    img = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    # Load the font
+    font = (
+        ImageFont.truetype(font_path, font_size)
+        if font_path
+        else ImageFont.load_default()
+    )
+
+    # Draw the text on the image at the specified position
+    with stats.timer("render"):
+        draw.text((text_x, text_y), text, font=font, fill=(255, 255, 255, 255))
+
+        if not has_alpha(format):
+            img = img.convert("RGB")
+    stats.count("frames")
+
+    if rect is not None:
+        with stats.timer("write"):
+            written = write_region(
+                framebuffer_path,
+                np.asarray(img),
+                rect[0],
+                rect[1],
+                width,
+                height,
+                stride,
+                format,
+                force_alpha,
+            )
+        print(f"Updated region {written} of {framebuffer_path}")
+        return
+
+    with stats.timer("pack"):
+        fb_arr = encode(np.asarray(img), format, stride, force_alpha)
+
+    # Save the framebuffer data to a file
+    with stats.timer("write"):
+        write_output(framebuffer_path, fb_arr)
+    print("Framebuffer data saved to:", framebuffer_path)
+
+
+class TextOverlay:
+    # Keeps a framebuffer (file or device) mapped and the font's glyph atlas
+    # loaded so text can be redrawn repeatedly. Each draw only rewrites the
+    # bounding box of the new text together with that of the text it replaces;
+    # the rest of the framebuffer is never touched.
+    def __init__(
+        self,
+        framebuffer_path,
+        width,
+        height,
+        stride=None,
+        format="RGB565",
+        font_path=None,
+        font_size=8,
+        force_alpha=False,
+    ):
+        if stride is None:
+            stride = calculate_stride(width, format)
+        self.width, self.height = width, height
+        self.format = format
+        self.force_alpha = force_alpha
+        self.bpp = bytes_per_pixel(format)
+        self.channels = 4 if has_alpha(format) else 3
+        self.atlas = load_atlas(font_path, font_size)
+        self.box = None
+
+        if not os.path.exists(framebuffer_path):
+            # Start from the same blank frame text_to_framebuffer would write
+            fb_arr = allocate_framebuffer(height, stride)
+            background = np.zeros((height, width, self.channels), dtype=np.uint8)
+            encode(background, format, stride, force_alpha, out=fb_arr)
+            fb_arr.tofile(framebuffer_path)
+        self.mm, fb_data = map_framebuffer(
+            framebuffer_path, 0, frame_size(height, stride), write=True
+        )
+        self.fb_arr = fb_data.reshape((height, stride))
+
+    def draw(self, text, text_x=0, text_y=0):
+        # Returns the (x0, y0, x1, y1) pixel box that was rewritten
+        with stats.timer("render"):
+            mask, left, top = self.atlas.render(text)
+        stats.count("frames")
+        x0, y0 = text_x + left, text_y + top
+        box = (
+            max(x0, 0),
+            max(y0, 0),
+            min(x0 + mask.shape[1], self.width),
+            min(y0 + mask.shape[0], self.height),
+        )
+        if box[0] >= box[2] or box[1] >= box[3]:
+            box = None
+
+        # Compose the union of the old and new boxes in one go so a live
+        # display never shows the old text erased without the new one drawn
+        boxes = [b for b in (box, self.box) if b is not None]
+        rewritten = None
+        if boxes:
+            ux0 = min(b[0] for b in boxes)
+            uy0 = min(b[1] for b in boxes)
+            ux1 = max(b[2] for b in boxes)
+            uy1 = max(b[3] for b in boxes)
+            img_arr = np.zeros((uy1 - uy0, ux1 - ux0, self.channels), dtype=np.uint8)
+            if box is not None:
+                # ImageDraw paints white over the transparent background and
+                # keeps the coverage in alpha, so any covered pixel is white
+                glyphs = mask[box[1] - y0 : box[3] - y0, box[0] - x0 : box[2] - x0]
+                text_arr = img_arr[
+                    box[1] - uy0 : box[3] - uy0, box[0] - ux0 : box[2] - ux0
+                ]
+                text_arr[:, :, :3][glyphs > 0] = 255
+                if self.channels == 4:
+                    text_arr[:, :, 3] = glyphs
+            region = self.fb_arr[uy0:uy1, ux0 * self.bpp : ux1 * self.bpp]
+            with stats.timer("pack"):
+                encode(img_arr, self.format, force_alpha=self.force_alpha, out=region)
+            stats.count("bytes_written", region.nbytes)
+            rewritten = (ux0, uy0, ux1, uy1)
+        self.box = box
+        return rewritten
+
+    def close(self):
+        self.fb_arr = None
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Convert text to an Android framebuffer"
+    )
+    parser.add_argument("text", type=str, help="Text to render.")
+    parser.add_argument(
+        "framebuffer_path",
+        type=str,
+        help="Path to the output framebuffer binary file, - for stdout or tcp:HOST:PORT.",
+    )
+    parser.add_argument(
+        "width", type=int, nargs="?", help="Width of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "height", type=int, nargs="?", help="Height of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "--stride", type=int, help="Stride of the framebuffer (optional)."
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=None,
+        choices=FORMATS,
+        help="Framebuffer format (default: RGB565).",
+    )
+    parser.add_argument(
+        "--font-path", type=str, help="Path to the font file (optional)."
+    )
+    parser.add_argument(
+        "--font-size", type=int, default=8, help="Font size (default: 8)."
+    )
+    parser.add_argument(
+        "--text-x", type=int, default=0, help="X position of the text (default: 0)."
+    )
+    parser.add_argument(
+        "--text-y", type=int, default=0, help="Y position of the text (default: 0)."
+    )
+    parser.add_argument(
+        "--force-alpha",
+        action="store_true",
+        help="Force the alpha value to be 255.",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Draw into an existing framebuffer file or device, rewriting only the text's bounding box. With - as the text, redraw on every line read from stdin.",
+    )
+    parser.add_argument(
+        "--rect",
+        type=parse_rect,
+        help="Clear the X,Y,WIDTH,HEIGHT rectangle of an existing framebuffer file or device and draw the text into it, in place. --text-x and --text-y are relative to the rectangle.",
+    )
+    add_profile_arguments(parser)
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_profile(parser, args, formats=FORMATS)
+    start_stats(args)
+    if (args.in_place or args.rect is not None) and is_stream_target(
+        args.framebuffer_path
+    ):
+        parser.error("--in-place and --rect need a framebuffer file or device")
+    if args.framebuffer_path == "-":
+        reserve_stdout()
+    print(f"Using format: {args.format}")
+    print(f"Force alpha: {args.force_alpha}")
+
+    if args.in_place:
+        with TextOverlay(
+            args.framebuffer_path,
+            args.width,
+            args.height,
+            args.stride,
+            args.format,
+            args.font_path,
+            args.font_size,
+            args.force_alpha,
+        ) as overlay:
+            lines = (
+                (line.rstrip("\n") for line in sys.stdin)
+                if args.text == "-"
+                else [args.text]
+            )
+            try:
+                for text in lines:
+                    box = overlay.draw(text, args.text_x, args.text_y)
+                    print(f"Updated {args.framebuffer_path} region {box}")
+            except KeyboardInterrupt:
+                pass
+        return
+
+    text_to_framebuffer(
+        args.text,
+        args.framebuffer_path,
+        args.width,
+        args.height,
+        args.stride,
+        args.format,
+        args.font_path,
+        args.font_size,
+        args.text_x,
+        args.text_y,
+        args.force_alpha,
+        args.rect,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+import argparse
+import os
+import time
+
+from fbutil.bundle import DEFAULT_LINK_SPEED, BundleWriter, bundle_report, is_bundle
+from fbutil.container import FLAG_DELTA, FrameContainerWriter
+from fbutil.delta import encode_delta
+from fbutil.formats import (
+    FORMATS,
+    allocate_framebuffer,
+    bytes_per_pixel,
+    calculate_stride,
+    encode,
+)
+from fbutil.framecache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_SIZE,
+    FrameCache,
+    source_hash,
+)
+from fbutil.pipeline import run_pipeline, run_process_pipeline
+from fbutil.profile import add_profile_arguments, apply_profile
+from fbutil.stream import open_stream, reserve_stdout
+from fbutil.timing import (
+    StageTimes,
+    add_stats_arguments,
+    format_times,
+    start_stats,
+    stats,
+)
+
+# Resize interpolation per preset: (shrinking, enlarging), as cv2 attribute
+# names so OpenCV is only imported once a video is actually converted
+INTERPOLATION_PRESETS = {
+    "fast": ("INTER_NEAREST", "INTER_NEAREST"),
+    "balanced": ("INTER_LINEAR", "INTER_LINEAR"),
+    "quality": ("INTER_AREA", "INTER_CUBIC"),
+}
+
+
+def resize_frame(frame, width, height, preset="balanced"):
+    src_height, src_width = frame.shape[:2]
+    if (src_width, src_height) == (width, height):
+        return frame
+
+    import cv2
+
+    shrinking = width * height < src_width * src_height
+    interpolation = INTERPOLATION_PRESETS[preset][0 if shrinking else 1]
+    return cv2.resize(frame, (width, height), interpolation=getattr(cv2, interpolation))
+
+
+def convert_frame(
+    frame, width, height, stride, format, force_alpha, preset="balanced", times=None
+):
+    # Goes from the decoded BGR frame to a new (height, stride) framebuffer
+    # array, through the same pack_frame the conversion pipeline uses
+    if stride is None:
+        stride = calculate_stride(width, format)
+    fb_arr = allocate_framebuffer(height, stride)
+    frame_times, _ = pack_frame(
+        frame, fb_arr, width, height, stride, format, force_alpha, preset
+    )
+    if times is not None:
+        times.update(frame_times)
+    return fb_arr
+
+
+def pack_frame(
+    frame, out, width, height, stride, format, force_alpha, preset, cache_dir=None
+):
+    # Resizes a decoded BGR frame and packs it into out, a preallocated
+    # (height, stride) array. With a cache_dir the resized frame is also added
+    # to the frame cache. Returns (times, hash of the cached frame or None).
+    # This runs in the worker processes with --processes, so it only takes
+    # picklable arguments.
+    start = time.perf_counter()
+    frame = resize_frame(frame, width, height, preset)
+    times = {"resize": time.perf_counter() - start}
+    digest = None
+    if cache_dir:
+        start = time.perf_counter()
+        digest = FrameCache(cache_dir).store(frame)
+        times["cache"] = time.perf_counter() - start
+    start = time.perf_counter()
+    encode(frame, format, stride, force_alpha, out=out, bgr=True)
+    times["pack"] = time.perf_counter() - start
+    return times, digest
+
+
+def write_frame(frame_index, fb_arr, output_folder):
+    output_path = os.path.join(output_folder, f"{frame_index}.bin")
+    fb_arr.tofile(output_path)
+    stats.count("bytes_written", fb_arr.nbytes)
+    return output_path
+
+
+def parse_time(value):
+    # Seconds, or [HH:]MM:SS(.fraction)
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def read_frames(cap, start=None, end=None, fps=None):
+    # Yields the decoded frames with their decode time. With start and end (in
+    # seconds) only that part of the video is read: the capture seeks to
+    # start and stops at end. With fps, frames are picked at that rate and the
+    # ones in between are only grabbed, which skips decoding them.
+    import cv2
+
+    if start:
+        cap.set(cv2.CAP_PROP_POS_MSEC, start * 1000)
+    # Frames within half a source frame of the next output time are taken
+    tolerance = 0.5 / (cap.get(cv2.CAP_PROP_FPS) or 1000)
+    next_time = start or 0
+    while True:
+        begin = time.perf_counter()
+        if not cap.grab():
+            break
+        position = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if end is not None and position >= end - tolerance:
+            break
+        if position < next_time - tolerance:
+            stats.count("skipped")
+            continue
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
+        if fps:
+            next_time += 1 / fps
+            if next_time < position - tolerance:
+                # Catch up after a gap in the timestamps
+                next_time = position + 1 / fps
+        yield frame, {"decode": time.perf_counter() - begin}
+
+
+def read_cached_frames(frame_cache, frames):
+    cached = frame_cache.read(frames)
+    while True:
+        start = time.perf_counter()
+        frame = next(cached, None)
+        if frame is None:
+            break
+        yield frame, {"load": time.perf_counter() - start}
+
+
+def video_to_framebuffer(
+    video_path,
+    output_folder,
+    width,
+    height,
+    stride=None,
+    format="RGB565",
+    force_alpha=False,
+    workers=None,
+    write_workers=2,
+    queue_size=8,
+    container=False,
+    delta=False,
+    keyframe_interval=0,
+    tile_size=32,
+    stream=False,
+    preset="balanced",
+    bundle=False,
+    compress_level=6,
+    chunk_frames=1,
+    link_speed=DEFAULT_LINK_SPEED,
+    cache_dir=None,
+    cache_size=DEFAULT_CACHE_SIZE,
+    processes=None,
+    start=None,
+    end=None,
+    target_fps=None,
+):
+    if delta and not container:
+        raise ValueError("Delta encoding is only supported with container output")
+    if sum((container, stream, bundle)) > 1:
+        raise ValueError("Only one of container, stream and bundle output can be used")
+    if start is not None and end is not None and end <= start:
+        raise ValueError(f"The end time ({end}s) must come after the start ({start}s)")
+    if target_fps is not None and target_fps <= 0:
+        raise ValueError(f"Invalid target frame rate: {target_fps}")
+
+    if workers is None:
+        workers = os.cpu_count() or 4
+    if stride is None:
+        stride = calculate_stride(width, format)
+
+    # With a cache, frames resized for this video and size before are loaded
+    # instead of being decoded and resized again
+    frame_cache = cached = frame_hashes = cap = None
+    if cache_dir:
+        frame_cache = FrameCache(cache_dir, cache_size * 1e6)
+        index_path = frame_cache.index_path(
+            source_hash(video_path, cache_dir),
+            width,
+            height,
+            preset,
+            start,
+            end,
+            target_fps,
+        )
+        cached = frame_cache.lookup(index_path)
+    if cached is not None:
+        fps = cached["fps"]
+        frames = read_cached_frames(frame_cache, cached["frames"])
+        print(
+            f"Using {len(cached['frames'])} cached frames "
+            f"({len(set(cached['frames']))} distinct) from {cache_dir}"
+        )
+    else:
+        import cv2
+
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if target_fps and (not fps or target_fps < fps):
+            fps = target_fps
+        frames = read_frames(cap, start, end, target_fps)
+        if frame_cache is not None:
+            frame_hashes = {}
+
+    def frame_key(frame_index):
+        # Hash of the resized frame, known when the frame cache is used
+        if cached is not None:
+            return cached["frames"][frame_index]
+        if frame_hashes is not None:
+            return frame_hashes.get(frame_index)
+        return None
+
+    if container:
+        # output_folder is the container file, frames must be appended in order
+        writer = FrameContainerWriter(
+            output_folder,
+            width,
+            height,
+            stride,
+            format,
+            fps,
+            FLAG_DELTA if delta else 0,
+        )
+        write_workers = 1
+        previous = [None]
+        # First frame stored for each frame hash
+        stored = {}
+
+        def write(frame_index, fb_arr):
+            if delta:
+                # Only tiles that changed since the previous frame are stored
+                keyframe = previous[0] is None or (
+                    keyframe_interval and frame_index % keyframe_interval == 0
+                )
+                payload = encode_delta(
+                    None if keyframe else previous[0],
+                    fb_arr,
+                    tile_size,
+                    tile_size * bytes_per_pixel(format),
+                )
+                # With --processes fb_arr is a buffer that gets reused
+                previous[0] = fb_arr.copy()
+                writer.write_frame(payload)
+                return f"{output_folder} ({len(payload)} bytes)"
+            key = frame_key(frame_index)
+            if key in stored:
+                # Same pixels as an earlier frame, share its payload
+                writer.share_frame(stored[key])
+                stats.count("frames_shared")
+                return f"{output_folder} (same as frame {stored[key]})"
+            if key is not None:
+                stored[key] = frame_index
+            writer.write_frame(fb_arr)
+            return output_folder
+
+    elif bundle:
+        # output_folder is the bundle file; frames are compressed in order as
+        # they are converted
+        writer = BundleWriter(output_folder, compress_level, chunk_frames)
+        write_workers = 1
+
+        def write(frame_index, fb_arr):
+            writer.write_frame(fb_arr)
+            return output_folder
+
+    elif stream:
+        # output_folder is a stream target; frames are written back to back as
+        # they are converted, so the reader can display them while the rest of
+        # the video is still being decoded
+        writer = open_stream(output_folder)
+        write_workers = 1
+
+        def write(frame_index, fb_arr):
+            writer.write(fb_arr)
+            return output_folder
+
+    else:
+        writer = None
+        if not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+
+        def write(frame_index, fb_arr):
+            return write_frame(frame_index, fb_arr, output_folder)
+
+    stage_times = StageTimes()
+
+    # Frames decoded from the video are added to the cache as they are resized
+    pack_args = (
+        width,
+        height,
+        stride,
+        format,
+        force_alpha,
+        preset,
+        cache_dir if frame_hashes is not None else None,
+    )
+
+    def packed(frame_index, times, result):
+        pack_times, digest = result
+        times.update(pack_times)
+        if digest is not None:
+            frame_hashes[frame_index] = digest
+
+    def convert(item):
+        frame_index, (frame, times) = item
+        fb_arr = allocate_framebuffer(height, stride)
+        packed(frame_index, times, pack_frame(frame, fb_arr, *pack_args))
+        return fb_arr, times
+
+    def timed_write(frame_index, result):
+        fb_arr, times = result
+        start = time.perf_counter()
+        destination = write(frame_index, fb_arr)
+        times["write"] = time.perf_counter() - start
+        stage_times.add(times)
+        stats.add_times(times)
+        stats.count("frames")
+        print(
+            f"Saved framebuffer for frame {frame_index} to {destination} ({format_times(times)})"
+        )
+
+    start = time.perf_counter()
+    try:
+        # Decoding only runs ahead of conversion by the queue size, so memory
+        # use does not grow with the length of the video
+        if processes:
+            # Frames are handed to the worker processes and packed through
+            # shared memory, and written here in order
+            def write_packed(frame_index, fb_arr, times, result):
+                packed(frame_index, times, result)
+                timed_write(frame_index, (fb_arr, times))
+
+            run_process_pipeline(
+                frames,
+                pack_frame,
+                write_packed,
+                (height, stride),
+                pack_args,
+                processes=processes,
+                slots=processes + queue_size,
+            )
+        else:
+            run_pipeline(
+                enumerate(frames),
+                convert,
+                timed_write,
+                convert_workers=workers,
+                write_workers=write_workers,
+                queue_size=queue_size,
+            )
+    finally:
+        if cap is not None:
+            cap.release()
+        if writer is not None:
+            writer.close()
+
+    print(
+        f"Converted {stage_times.count} frames, average per frame: "
+        f"{format_times(stage_times.averages())}"
+    )
+    if frame_hashes is not None:
+        hashes = [frame_hashes[i] for i in range(len(frame_hashes))]
+        frame_cache.save_index(index_path, hashes, fps)
+        cache_bytes = frame_cache.evict()
+        print(
+            f"Cached {len(hashes)} resized frames ({len(set(hashes))} distinct) in "
+            f"{cache_dir}, {cache_bytes / 1e6:.1f} of {cache_size} MB used"
+        )
+    if bundle:
+        bundle_report(
+            writer.raw_bytes,
+            writer.compressed_bytes,
+            writer.frames,
+            time.perf_counter() - start,
+            link_speed,
+        )
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Convert each frame of a video to Android framebuffers"
+    )
+    parser.add_argument("video_path", type=str, help="Path to the input video file.")
+    parser.add_argument(
+        "output_folder",
+        type=str,
+        help="Folder to save the framebuffer files (the file to write with --container, or the stream target with --stream).",
+    )
+    parser.add_argument(
+        "width", type=int, nargs="?", help="Width of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "height", type=int, nargs="?", help="Height of the screen (or use --profile)."
+    )
+    parser.add_argument(
+        "--stride", type=int, help="Stride of the framebuffer (optional)."
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=None,
+        choices=FORMATS,
+        help="Framebuffer format (default: RGB565).",
+    )
+    parser.add_argument(
+        "--force-alpha",
+        action="store_true",
+        help="Force the alpha value to be 255.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of frame conversion threads (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--write-workers",
+        type=int,
+        default=2,
+        help="Number of threads writing frames to disk (default: 2).",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=8,
+        help="Frames buffered between the decode, convert and write stages (default: 8).",
+    )
+    parser.add_argument(
+        "--start",
+        type=parse_time,
+        help="Start converting at this time, in seconds or [HH:]MM:SS (default: the beginning).",
+    )
+    parser.add_argument(
+        "--end",
+        type=parse_time,
+        help="Stop converting at this time, in seconds or [HH:]MM:SS (default: the end).",
+    )
+    parser.add_argument(
+        "--fps",
+        type=float,
+        help="Output frame rate; frames in between are skipped without being decoded (default: the video's frame rate).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        nargs="?",
+        const=os.cpu_count() or 4,
+        default=None,
+        metavar="N",
+        help="Convert frames in N worker processes instead of threads, handing frames over through shared memory (default N: number of CPUs).",
+    )
+    parser.add_argument(
+        "--container",
+        action="store_true",
+        help="Write every frame into a single packed, indexed file instead of one .bin per frame.",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Store only the tiles that changed since the previous frame (requires --container).",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=0,
+        help="Store a full frame every N frames in delta mode (default: first frame only).",
+    )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=32,
+        help="Tile size in pixels used to find changed regions in delta mode (default: 32).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write frames back to back to a pipe, device or socket: - for stdout, tcp:HOST:PORT, or a path.",
+    )
+    parser.add_argument(
+        "--preset",
+        default="balanced",
+        choices=list(INTERPOLATION_PRESETS),
+        help="Resize speed/quality trade-off: nearest, bilinear, or area/bicubic (default: balanced).",
+    )
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Write a compressed bundle for pushing to the device: .tar.gz (frame files) or .gz (frames in gzip chunks plus a .idx file).",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=6,
+        choices=range(1, 10),
+        metavar="1-9",
+        help="gzip compression level for --bundle (default: 6).",
+    )
+    parser.add_argument(
+        "--chunk-frames",
+        type=int,
+        default=1,
+        help="Frames per independently decompressible gzip chunk in a .gz bundle, 0 for a single chunk (default: 1).",
+    )
+    parser.add_argument(
+        "--link-speed",
+        type=float,
+        default=DEFAULT_LINK_SPEED,
+        help=f"Transfer speed in MB/s used for the push time estimate (default: {DEFAULT_LINK_SPEED:g}).",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        default=None,
+        metavar="DIR",
+        help=f"Keep the resized frames in a cache, so converting this video at the same size again (e.g. for another format or stride) skips decoding and resizing (default folder: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help=f"Size limit of the frame cache in MB; the least recently used frames are removed beyond it (default: {DEFAULT_CACHE_SIZE}).",
+    )
+    add_profile_arguments(parser)
+    add_stats_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_profile(parser, args, formats=FORMATS)
+    if args.bundle and not is_bundle(args.output_folder):
+        parser.error("--bundle needs an output name ending in .tar.gz, .tgz or .gz")
+    start_stats(args)
+    if args.stream and args.output_folder == "-":
+        reserve_stdout()
+
+    video_to_framebuffer(
+        args.video_path,
+        args.output_folder,
+        args.width,
+        args.height,
+        args.stride,
+        args.format,
+        args.force_alpha,
+        args.workers,
+        args.write_workers,
+        args.queue_size,
+        args.container,
+        args.delta,
+        args.keyframe_interval,
+        args.tile_size,
+        args.stream,
+        args.preset,
+        args.bundle,
+        args.compress_level,
+        args.chunk_frames,
+        args.link_speed,
+        args.cache,
+        args.cache_size,
+        args.processes,
+        args.start,
+        args.end,
+        args.fps,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def make_video(tmp_path):
+    # Writes (height, width, 3) BGR frames into an MJPEG video and returns its
+    # path. Identical input frames decode to identical frames.
+    def make_video(frames, name="input.avi", fps=10):
+        import cv2
+
+        path = str(tmp_path / name)
+        height, width = frames[0].shape[:2]
+        writer = cv2.VideoWriter(
+            path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height)
+        )
+        for frame in frames:
+            writer.write(np.ascontiguousarray(frame))
+        writer.release()
+        return path
+
+    return make_video
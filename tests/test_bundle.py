@@ -0,0 +1,143 @@
+import gzip
+import os
+
+import numpy as np
+import pytest
+
+from fbutil.bundle import INDEX_SUFFIX, BundleWriter, is_bundle, read_bundle, read_index
+from fbutil.tools.fbbundle import bundle_frames, verify_bundle
+
+HEIGHT, STRIDE = 6, 40
+FRAME_COUNT = 7
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(19)
+    # Few distinct values, so the frames compress like real screens do
+    return [
+        rng.integers(0, 4, (HEIGHT, STRIDE), dtype=np.uint8) for _ in range(FRAME_COUNT)
+    ]
+
+
+@pytest.fixture
+def frame_folder(tmp_path, frames):
+    folder = tmp_path / "frames"
+    folder.mkdir()
+    for i, frame in enumerate(frames):
+        frame.tofile(folder / f"{i}.bin")
+    return str(folder)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("video.tar.gz", True),
+        ("video.TGZ", True),
+        ("video.gz", True),
+        ("video.bin", False),
+        ("video.tar", False),
+    ],
+)
+def test_is_bundle(name, expected):
+    assert is_bundle(name) == expected
+
+
+def test_writer_rejects_names_that_are_not_bundles(tmp_path):
+    with pytest.raises(ValueError):
+        BundleWriter(str(tmp_path / "video.tar"))
+    assert not os.path.exists(tmp_path / "video.tar")
+
+
+@pytest.mark.parametrize("name", ["video.tar.gz", "video.tgz", "video.gz"])
+def test_bundle_round_trip(tmp_path, frames, name):
+    path = str(tmp_path / name)
+    with BundleWriter(path) as writer:
+        for frame in frames:
+            writer.write_frame(frame)
+    assert writer.frames == FRAME_COUNT
+    assert writer.raw_bytes == FRAME_COUNT * HEIGHT * STRIDE
+    assert writer.compressed_bytes < writer.raw_bytes
+    # Only .gz bundles need an index to find their frames
+    assert os.path.exists(path + INDEX_SUFFIX) == name.endswith("video.gz")
+
+    read = list(read_bundle(path))
+    assert read == [frame.tobytes() for frame in frames]
+
+
+@pytest.mark.parametrize("chunk_frames", [1, 3, 0])
+def test_index_lists_independent_gzip_members(tmp_path, frames, chunk_frames):
+    path = str(tmp_path / "video.gz")
+    with BundleWriter(path, chunk_frames=chunk_frames) as writer:
+        for frame in frames:
+            writer.write_frame(frame)
+
+    frame_size, chunks = read_index(path)
+    assert frame_size == HEIGHT * STRIDE
+    per_chunk = chunk_frames or FRAME_COUNT
+    assert len(chunks) == -(-FRAME_COUNT // per_chunk)
+    with open(path, "rb") as f:
+        data = f.read()
+    # The chunks cover the file back to back, and each one decompresses on
+    # its own to exactly the frames it lists
+    expected_offset = 0
+    first_frames = []
+    for offset, length, first_frame, count in chunks:
+        assert offset == expected_offset
+        expected_offset += length
+        first_frames.append(first_frame)
+        raw = gzip.decompress(data[offset : offset + length])
+        want = frames[first_frame : first_frame + count]
+        assert count == len(want)
+        assert raw == b"".join(frame.tobytes() for frame in want)
+    assert expected_offset == len(data)
+    assert first_frames == list(range(0, FRAME_COUNT, per_chunk))
+
+
+def test_index_without_frame_size_is_rejected(tmp_path, frames):
+    path = str(tmp_path / "video.gz")
+    with BundleWriter(path) as writer:
+        writer.write_frame(frames[0])
+    with open(path + INDEX_SUFFIX) as f:
+        lines = f.readlines()
+    with open(path + INDEX_SUFFIX, "w") as f:
+        f.writelines(lines[1:])
+    with pytest.raises(ValueError, match="frame size"):
+        read_index(path)
+    with pytest.raises(ValueError, match="frame size"):
+        list(read_bundle(path))
+
+
+def test_truncated_frame_is_rejected(tmp_path, frames):
+    path = str(tmp_path / "video.gz")
+    with BundleWriter(path) as writer:
+        writer.write_frame(frames[0])
+    with pytest.raises(ValueError, match="middle of a frame"):
+        list(read_bundle(path, frame_size=HEIGHT * STRIDE + 1))
+
+
+def test_frames_of_another_size_are_rejected(tmp_path, frames):
+    with BundleWriter(str(tmp_path / "video.gz")) as writer:
+        writer.write_frame(frames[0])
+        with pytest.raises(ValueError, match="expected"):
+            writer.write_frame(frames[1][:, :-1])
+
+
+@pytest.mark.parametrize("name", ["video.tar.gz", "video.gz"])
+def test_fbbundle_verifies_against_source(tmp_path, frame_folder, name):
+    path = str(tmp_path / name)
+    result = bundle_frames(frame_folder, path, chunk_frames=2)
+    assert result["frames"] == FRAME_COUNT
+    assert verify_bundle(path, frame_folder) == FRAME_COUNT
+
+    # A changed source frame, or one missing, is reported
+    changed = np.fromfile(os.path.join(frame_folder, "3.bin"), dtype=np.uint8)
+    changed[0] ^= 0xFF
+    changed.tofile(os.path.join(frame_folder, "3.bin"))
+    with pytest.raises(ValueError, match="Frame 3"):
+        verify_bundle(path, frame_folder)
+    changed[0] ^= 0xFF
+    changed.tofile(os.path.join(frame_folder, "3.bin"))
+    os.remove(os.path.join(frame_folder, f"{FRAME_COUNT - 1}.bin"))
+    with pytest.raises(ValueError, match="more frames"):
+        verify_bundle(path, frame_folder)
@@ -0,0 +1,59 @@
+import json
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from fbutil import cli
+from fbutil.tools import fbinfo
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / "in.png"
+    Image.fromarray(np.zeros((2, 4, 3), dtype=np.uint8)).save(path)
+    return path
+
+
+def test_commands_in_one_process_get_their_own_stats(tmp_path, image_path):
+    for name in ("first", "second"):
+        json_path = tmp_path / f"{name}.json"
+        argv = ["img2fb", str(image_path), str(tmp_path / f"{name}.bin"), "4", "2"]
+        cli.main(argv + ["--stats-json", str(json_path)])
+        # Written when the command returns, not when the process exits
+        with open(json_path) as f:
+            assert json.load(f)["counters"]["frames"] == 1
+
+
+def test_stdout_is_restored_after_streaming(capfd):
+    stdout = sys.stdout
+    argv = ["--color", "616263", "--width", "2", "--height", "1"]
+    cli.main(["fbfill"] + argv + ["--format", "RGB888", "--framebuffer", "-"])
+    assert sys.stdout is stdout
+    print("after")
+    out, err = capfd.readouterr()
+    assert out == "abcabcafter\n"
+    assert "Created framebuffer" in err
+
+
+def test_fbinfo_mode_is_chosen_per_call(monkeypatch):
+    modes = []
+
+    def probe_device(local=False):
+        modes.append(local)
+        return {}
+
+    monkeypatch.setattr(fbinfo, "probe_device", probe_device)
+    fbinfo.main(["--local", "1", "--no-save"])
+    fbinfo.main(["--no-save"])
+    assert modes == [True, False]
+
+
+def test_fbinfo_sessions_are_kept_per_mode():
+    try:
+        assert fbinfo.get_session(as_root=True, local=True).command == ["su"]
+        assert fbinfo.get_session(as_root=True).command == ["adb", "shell", "su"]
+        assert fbinfo.get_session(local=True).command == ["sh"]
+    finally:
+        fbinfo.close_sessions()
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from fbutil.container import FLAG_DELTA, FrameContainer, FrameContainerWriter
+from fbutil.delta import apply_delta, dirty_tiles, encode_delta, is_keyframe
+
+# Not a multiple of the tile size, so the last tile row and column are partial
+HEIGHT, STRIDE = 70, 300
+TILE_ROWS, TILE_BYTES = 32, 128
+
+
+def frames(count, seed=5):
+    # Frames that each change a few small rectangles of the previous one
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (HEIGHT, STRIDE), dtype=np.uint8)
+    result = [frame]
+    for _ in range(count - 1):
+        frame = frame.copy()
+        for _ in range(rng.integers(0, 4)):
+            y, x = rng.integers(0, HEIGHT), rng.integers(0, STRIDE)
+            frame[y : y + 9, x : x + 40] = rng.integers(0, 256)
+        result.append(frame)
+    return result
+
+
+def test_keyframe_holds_the_whole_frame():
+    frame = frames(1)[0]
+    payload = encode_delta(None, frame, TILE_ROWS, TILE_BYTES)
+    assert is_keyframe(payload, HEIGHT, STRIDE)
+    out = np.full((HEIGHT, STRIDE), 0xEE, dtype=np.uint8)
+    np.testing.assert_array_equal(apply_delta(payload, out), frame)
+
+
+def test_delta_round_trip():
+    sequence = frames(20)
+    out = sequence[0].copy()
+    for prev, curr in zip(sequence, sequence[1:]):
+        payload = encode_delta(prev, curr, TILE_ROWS, TILE_BYTES)
+        apply_delta(payload, out)
+        np.testing.assert_array_equal(out, curr)
+
+
+def test_unchanged_frame_has_no_tiles():
+    frame = frames(1)[0]
+    assert dirty_tiles(frame, frame.copy(), TILE_ROWS, TILE_BYTES) == []
+    payload = encode_delta(frame, frame.copy(), TILE_ROWS, TILE_BYTES)
+    out = frame.copy()
+    np.testing.assert_array_equal(apply_delta(payload, out), frame)
+
+
+def test_dirty_tiles_cover_changes_and_merge_runs():
+    prev = np.zeros((HEIGHT, STRIDE), dtype=np.uint8)
+    curr = prev.copy()
+    curr[0, 0] = 1
+    curr[0, 129] = 1
+    curr[HEIGHT - 1, STRIDE - 1] = 1
+    assert dirty_tiles(prev, curr, TILE_ROWS, TILE_BYTES) == [
+        # Two neighbouring tiles in the first tile row, merged
+        (0, 0, 32, 256),
+        # The partial tile in the bottom right corner
+        (64, 256, 6, 44),
+    ]
+
+
+def write_container(path, sequence, keyframe_interval):
+    # Stores the frames the way vid2fb --delta does
+    with FrameContainerWriter(
+        path, STRIDE, HEIGHT, STRIDE, "RGB332", 10, FLAG_DELTA
+    ) as writer:
+        previous = None
+        for frame_index, frame in enumerate(sequence):
+            keyframe = previous is None or (
+                keyframe_interval and frame_index % keyframe_interval == 0
+            )
+            writer.write_frame(
+                encode_delta(
+                    None if keyframe else previous, frame, TILE_ROWS, TILE_BYTES
+                )
+            )
+            previous = frame
+
+
+@pytest.mark.parametrize("keyframe_interval", [0, 4])
+def test_container_replays_from_any_frame(tmp_path, keyframe_interval):
+    sequence = frames(13)
+    path = str(tmp_path / "frames.fbc")
+    write_container(path, sequence, keyframe_interval)
+    with FrameContainer(path) as container:
+        assert container.delta and len(container) == len(sequence)
+        keyframes = [
+            i
+            for i in range(len(container))
+            if is_keyframe(container.frame(i), HEIGHT, STRIDE)
+        ]
+        assert keyframes == ([0, 4, 8, 12] if keyframe_interval else [0])
+        # Start in the middle, in any order, with garbage in the output
+        for frame_index in [9, 2, 12, 4, 5, 0]:
+            out = np.full((HEIGHT, STRIDE), 0xEE, dtype=np.uint8)
+            container.render(frame_index, out)
+            np.testing.assert_array_equal(out, sequence[frame_index])
+
+
+def test_vid2fb_keyframe_interval(tmp_path, make_video):
+    from fbutil.tools.vid2fb import video_to_framebuffer
+
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    video = make_video([np.roll(image, i, axis=1) for i in range(10)])
+    plain = str(tmp_path / "plain.fbc")
+    delta = str(tmp_path / "delta.fbc")
+    video_to_framebuffer(video, plain, 64, 48, container=True)
+    video_to_framebuffer(
+        video, delta, 64, 48, container=True, delta=True, keyframe_interval=3
+    )
+    with FrameContainer(plain) as full, FrameContainer(delta) as replayed:
+        assert len(full) == len(replayed) == 10
+        keyframes = [
+            i
+            for i in range(len(replayed))
+            if is_keyframe(replayed.frame(i), 48, replayed.stride)
+        ]
+        assert keyframes == [0, 3, 6, 9]
+        for frame_index in [7, 1, 9]:
+            np.testing.assert_array_equal(
+                replayed.render(frame_index), full.render(frame_index)
+            )
@@ -0,0 +1,42 @@
+import tracemalloc
+
+import pytest
+
+from fbutil.tools.fbbench import measure
+
+SIZE = 1 << 20
+
+
+def allocate():
+    # Holds SIZE bytes for the length of the run
+    data = bytearray(SIZE)
+    return len(data)
+
+
+@pytest.fixture
+def traced():
+    # The whole run traced, as with --tracemalloc
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_measure_without_tracing():
+    seconds, peak = measure(allocate, 2)
+    assert seconds >= 0
+    assert peak >= SIZE
+    assert not tracemalloc.is_tracing()
+
+
+def test_measure_keeps_tracing_on(traced):
+    seconds, peak = measure(allocate, 2)
+    assert SIZE <= peak < 2 * SIZE
+    assert tracemalloc.is_tracing()
+
+
+def test_measure_without_reset_peak(traced, monkeypatch):
+    # Python 3.8 has no tracemalloc.reset_peak
+    monkeypatch.delattr(tracemalloc, "reset_peak")
+    seconds, peak = measure(allocate, 2)
+    assert peak >= SIZE
+    assert tracemalloc.is_tracing()
@@ -0,0 +1,153 @@
+import os
+import shutil
+
+import pytest
+
+from fbutil.tools.fbpush import main, push_frames
+
+FAKE_ADB = os.path.join(os.path.dirname(__file__), "..", "fbpush", "fake_adb.sh")
+REMOTE_DIR = "/sdcard/frames"
+FRAME_COUNT = 12
+
+# Logs every adb call before handing it to fake_adb.sh. With FAKE_ADB_FLAKY
+# set, the first push of each file fails, so every file needs one retry.
+WRAPPER = """#!/bin/sh
+echo "$*" >> "$FAKE_ADB_LOG"
+if [ "$1" = push ] && [ -n "$FAKE_ADB_FLAKY" ]; then
+    marker="$FAKE_ADB_LOG.$(basename "$2")"
+    if [ ! -e "$marker" ]; then
+        touch "$marker"
+        echo "adb: error: failed to copy '$2' (flaky)" >&2
+        exit 1
+    fi
+fi
+exec sh {fake_adb} "$@"
+"""
+
+
+@pytest.fixture
+def device(tmp_path, monkeypatch):
+    # The fake device's file system, and the log of adb calls made to it
+    root = tmp_path / "device"
+    root.mkdir()
+    log = tmp_path / "adb.log"
+    adb = tmp_path / "adb"
+    adb.write_text(WRAPPER.format(fake_adb=os.path.abspath(FAKE_ADB)))
+    adb.chmod(0o755)
+    monkeypatch.setenv("FAKE_ADB_ROOT", str(root))
+    monkeypatch.setenv("FAKE_ADB_LOG", str(log))
+    monkeypatch.delenv("FAKE_ADB_FAIL", raising=False)
+    monkeypatch.delenv("FAKE_ADB_FLAKY", raising=False)
+
+    class Device:
+        path = str(adb)
+        folder = str(root) + REMOTE_DIR
+
+        def calls(self, command):
+            if not log.exists():
+                return []
+            lines = log.read_text().splitlines()
+            return [line for line in lines if line.split()[0] == command]
+
+        def pushed(self):
+            return sorted(
+                os.path.basename(line.split()[1]) for line in self.calls("push")
+            )
+
+    return Device()
+
+
+@pytest.fixture
+def frames(tmp_path):
+    folder = tmp_path / "frames"
+    folder.mkdir()
+    for i in range(FRAME_COUNT):
+        (folder / f"{i}.bin").write_bytes(bytes([i]) * (100 + i))
+    return str(folder)
+
+
+def names(count):
+    return sorted(f"{i}.bin" for i in range(count))
+
+
+def assert_same_files(frames, device):
+    for name in os.listdir(frames):
+        with open(os.path.join(frames, name), "rb") as f, open(
+            os.path.join(device.folder, name), "rb"
+        ) as g:
+            assert f.read() == g.read()
+
+
+def test_push_lists_the_device_once(frames, device):
+    result = push_frames(frames, REMOTE_DIR, adb=device.path, jobs=3)
+    assert result["pushed"] == FRAME_COUNT
+    assert result["skipped"] == 0
+    assert result["failed"] == {}
+    assert result["bytes"] == sum(100 + i for i in range(FRAME_COUNT))
+    # One shell call lists every file instead of one per file
+    assert len(device.calls("shell")) == 1
+    assert device.pushed() == names(FRAME_COUNT)
+    assert_same_files(frames, device)
+
+
+@pytest.mark.parametrize("size_only", [False, True])
+def test_resume_skips_files_already_pushed(frames, device, size_only):
+    # An earlier push stopped after five files, and a sixth has the right size
+    # but different contents
+    os.makedirs(device.folder)
+    for i in range(5):
+        shutil.copy(os.path.join(frames, f"{i}.bin"), device.folder)
+    with open(os.path.join(device.folder, "5.bin"), "wb") as f:
+        f.write(b"\xff" * 105)
+
+    result = push_frames(
+        frames, REMOTE_DIR, adb=device.path, retries=0, size_only=size_only
+    )
+    # Only the checksums catch the changed file
+    skipped = 6 if size_only else 5
+    assert result["skipped"] == skipped
+    assert result["pushed"] == FRAME_COUNT - skipped
+    assert device.pushed() == sorted(f"{i}.bin" for i in range(skipped, FRAME_COUNT))
+    if not size_only:
+        assert_same_files(frames, device)
+
+    # Nothing is left to push the second time
+    result = push_frames(frames, REMOTE_DIR, adb=device.path, size_only=size_only)
+    assert result["skipped"] == FRAME_COUNT
+    assert result["pushed"] == 0
+    assert len(device.calls("push")) == FRAME_COUNT - skipped
+
+
+def test_failed_push_is_retried(frames, device, monkeypatch):
+    monkeypatch.setenv("FAKE_ADB_FLAKY", "1")
+    result = push_frames(frames, REMOTE_DIR, adb=device.path, jobs=4, retries=1)
+    assert result["pushed"] == FRAME_COUNT
+    assert result["failed"] == {}
+    # Every file failed once and went through on the retry
+    assert device.pushed() == sorted(names(FRAME_COUNT) * 2)
+    assert_same_files(frames, device)
+
+
+def test_push_gives_up_after_the_retries(frames, device, monkeypatch, capsys):
+    monkeypatch.setenv("FAKE_ADB_FAIL", "100")
+    result = push_frames(frames, REMOTE_DIR, adb=device.path, retries=1)
+    assert result["pushed"] == 0
+    assert sorted(result["failed"]) == sorted(
+        os.path.join(frames, name) for name in names(FRAME_COUNT)
+    )
+    assert all("simulated" in error for error in result["failed"].values())
+    assert device.pushed() == sorted(names(FRAME_COUNT) * 2)
+
+    with pytest.raises(SystemExit) as e:
+        main([frames, REMOTE_DIR, "--adb", device.path, "--retries", "0"])
+    assert e.value.code == 1
+    assert "Failed to push" in capsys.readouterr().out
+
+
+def test_bundle_is_pushed_with_its_index(tmp_path, device):
+    bundle = tmp_path / "video.gz"
+    bundle.write_bytes(b"bundle")
+    (tmp_path / "video.gz.idx").write_text("index\n")
+    result = push_frames(str(bundle), REMOTE_DIR, adb=device.path)
+    assert result["pushed"] == 2
+    assert device.pushed() == ["video.gz", "video.gz.idx"]
@@ -0,0 +1,142 @@
+import struct
+
+import numpy as np
+import pytest
+
+from fbutil.formats import FORMATS, decode, encode, has_alpha
+
+WIDTH, HEIGHT = 7, 5
+PADDING = 5
+
+
+def word(value, bits, shift):
+    # The top `bits` bits of an 8-bit channel, moved to `shift`
+    return (value >> (8 - bits)) << shift
+
+
+# Reference packing of one (r, g, b, a) pixel, written out per format
+REFERENCE = {
+    "ARGB8888": lambda r, g, b, a: struct.pack("BBBB", a, r, g, b),
+    "ABGR8888": lambda r, g, b, a: struct.pack("BBBB", a, b, g, r),
+    "BGRA8888": lambda r, g, b, a: struct.pack("BBBB", b, g, r, a),
+    "RGBA8888": lambda r, g, b, a: struct.pack("BBBB", r, g, b, a),
+    "RGB888": lambda r, g, b, a: struct.pack("BBB", r, g, b),
+    "BGR888": lambda r, g, b, a: struct.pack("BBB", b, g, r),
+    "RGB565": lambda r, g, b, a: struct.pack(
+        ">H", word(r, 5, 11) | word(g, 6, 5) | word(b, 5, 0)
+    ),
+    "RGB565_LE": lambda r, g, b, a: struct.pack(
+        "<H", word(r, 5, 11) | word(g, 6, 5) | word(b, 5, 0)
+    ),
+    "ARGB1555": lambda r, g, b, a: struct.pack(
+        ">H", word(a, 1, 15) | word(r, 5, 10) | word(g, 5, 5) | word(b, 5, 0)
+    ),
+    "ARGB1555_LE": lambda r, g, b, a: struct.pack(
+        "<H", word(a, 1, 15) | word(r, 5, 10) | word(g, 5, 5) | word(b, 5, 0)
+    ),
+    "RGB444": lambda r, g, b, a: struct.pack(
+        ">H", word(r, 4, 8) | word(g, 4, 4) | word(b, 4, 0)
+    ),
+    "RGB444_LE": lambda r, g, b, a: struct.pack(
+        "<H", word(r, 4, 8) | word(g, 4, 4) | word(b, 4, 0)
+    ),
+    "RGB332": lambda r, g, b, a: struct.pack(
+        "B", word(r, 3, 5) | word(g, 3, 2) | word(b, 2, 0)
+    ),
+}
+
+# Bits kept of each (r, g, b, a) channel, None for channels not stored
+CHANNEL_BITS = {
+    "ARGB8888": (8, 8, 8, 8),
+    "ABGR8888": (8, 8, 8, 8),
+    "BGRA8888": (8, 8, 8, 8),
+    "RGBA8888": (8, 8, 8, 8),
+    "RGB888": (8, 8, 8, None),
+    "BGR888": (8, 8, 8, None),
+    "RGB565": (5, 6, 5, None),
+    "RGB565_LE": (5, 6, 5, None),
+    "ARGB1555": (5, 5, 5, 1),
+    "ARGB1555_LE": (5, 5, 5, 1),
+    "RGB444": (4, 4, 4, None),
+    "RGB444_LE": (4, 4, 4, None),
+    "RGB332": (3, 3, 2, None),
+}
+
+
+def expand(value, bits):
+    # The top `bits` bits of value, scaled back to 0-255
+    field = value >> (8 - bits)
+    return int(field * 255 / ((1 << bits) - 1) + 0.5)
+
+
+@pytest.fixture
+def rgba():
+    rng = np.random.default_rng(20)
+    arr = rng.integers(0, 256, (HEIGHT, WIDTH, 4), dtype=np.uint8)
+    # Make sure the extremes and both 1-bit alpha values are covered
+    arr[0, 0] = (0, 0, 0, 0)
+    arr[0, 1] = (255, 255, 255, 255)
+    arr[0, 2] = (127, 128, 129, 127)
+    return arr
+
+
+def reference_frame(rgba, format, stride, alpha):
+    rows = []
+    for row in rgba:
+        data = b"".join(
+            REFERENCE[format](int(r), int(g), int(b), int(a) if alpha else 255)
+            for r, g, b, a in row
+        )
+        rows.append(data + b"\xee" * (stride - len(data)))
+    return np.frombuffer(b"".join(rows), dtype=np.uint8).reshape((HEIGHT, stride))
+
+
+@pytest.mark.parametrize("format", FORMATS)
+@pytest.mark.parametrize("channels", ["RGB", "RGBA", "BGR", "BGRA"])
+@pytest.mark.parametrize("padded", [False, True])
+def test_encode_matches_reference(rgba, format, channels, padded):
+    stride = WIDTH * len(REFERENCE[format](0, 0, 0, 0)) + (PADDING if padded else 0)
+    arr = rgba if channels.endswith("A") else rgba[:, :, :3]
+    if channels.startswith("BGR"):
+        arr = np.concatenate([arr[:, :, 2::-1], arr[:, :, 3:]], axis=2)
+
+    # Padding bytes must be left alone
+    out = np.full((HEIGHT, stride), 0xEE, dtype=np.uint8)
+    encode(arr, format, stride, out=out, bgr=channels.startswith("BGR"))
+    expected = reference_frame(rgba, format, stride, channels.endswith("A"))
+    np.testing.assert_array_equal(out, expected)
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_force_alpha_stores_opaque_pixels(rgba, format):
+    out = encode(rgba, format, force_alpha=True)
+    stride = out.shape[1]
+    np.testing.assert_array_equal(out, reference_frame(rgba, format, stride, False))
+
+
+@pytest.mark.parametrize("format", FORMATS)
+@pytest.mark.parametrize("padded", [False, True])
+def test_decode_expands_to_full_range(rgba, format, padded):
+    stride = WIDTH * len(REFERENCE[format](0, 0, 0, 0)) + (PADDING if padded else 0)
+    fb_data = reference_frame(rgba, format, stride, True).tobytes()
+    decoded = decode(fb_data, WIDTH, HEIGHT, format, stride)
+
+    bits = CHANNEL_BITS[format]
+    stored = [i for i, b in enumerate(bits) if b is not None]
+    assert has_alpha(format) == (bits[3] is not None)
+    assert decoded.shape == (HEIGHT, WIDTH, len(stored))
+    expected = np.array(
+        [
+            [[expand(int(pixel[i]), bits[i]) for i in stored] for pixel in row]
+            for row in rgba
+        ],
+        dtype=np.uint8,
+    )
+    np.testing.assert_array_equal(decoded, expected)
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_decoded_frames_encode_back_to_the_same_bytes(rgba, format):
+    fb_arr = encode(rgba, format)
+    decoded = decode(fb_arr, WIDTH, HEIGHT, format)
+    np.testing.assert_array_equal(encode(decoded, format), fb_arr)
@@ -0,0 +1,133 @@
+import itertools
+import random
+import threading
+import time
+
+import pytest
+
+from fbutil.pipeline import run_pipeline
+
+CONVERT_WORKERS = 4
+WRITE_WORKERS = 1
+QUEUE_SIZE = 2
+# Items the pipeline may hold between the producer and the end of a write
+IN_FLIGHT = CONVERT_WORKERS + WRITE_WORKERS + 2 * QUEUE_SIZE
+
+
+def run_in_thread(target, *args, **kwargs):
+    # Runs target in a daemon thread so a stuck pipeline fails the test
+    # instead of hanging it. Returns the thread and a dict with its outcome.
+    outcome = {}
+
+    def runner():
+        try:
+            outcome["result"] = target(*args, **kwargs)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+@pytest.mark.parametrize("convert_workers", [1, 3, 8])
+def test_writes_follow_item_order(convert_workers):
+    rng = random.Random(convert_workers)
+    delays = [rng.uniform(0, 0.005) for _ in range(60)]
+    written = []
+
+    def convert(item):
+        # Later items often finish converting before earlier ones
+        time.sleep(delays[item])
+        return item * 10
+
+    def write(index, result):
+        written.append((index, result))
+
+    count = run_pipeline(
+        range(len(delays)),
+        convert,
+        write,
+        convert_workers=convert_workers,
+        queue_size=QUEUE_SIZE,
+    )
+    assert count == len(delays)
+    assert written == [(i, i * 10) for i in range(len(delays))]
+
+
+def test_items_in_flight_are_bounded():
+    produced = []
+    release = threading.Event()
+
+    def items():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    def write(index, result):
+        release.wait()
+
+    thread, outcome = run_in_thread(
+        run_pipeline,
+        items(),
+        lambda item: item,
+        write,
+        convert_workers=CONVERT_WORKERS,
+        write_workers=WRITE_WORKERS,
+        queue_size=QUEUE_SIZE,
+    )
+    # With the writer stuck, the producer stops pulling items once the cap
+    # is reached; one more item may be waiting for a free place
+    time.sleep(0.5)
+    assert IN_FLIGHT <= len(produced) <= IN_FLIGHT + 1
+
+    release.set()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert outcome == {"result": 100}
+
+
+class StageError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("stage", ["items", "convert", "write"])
+def test_error_in_one_stage_stops_the_others(stage):
+    calls = {"convert": 0, "write": 0}
+
+    def items():
+        # Endless, so the pipeline only returns if the error stops it
+        for i in itertools.count():
+            if stage == "items" and i == 20:
+                raise StageError(i)
+            yield i
+
+    def convert(item):
+        calls["convert"] += 1
+        if stage == "convert" and item == 20:
+            raise StageError(item)
+        return item
+
+    def write(index, result):
+        calls["write"] += 1
+        if stage == "write" and index == 20:
+            raise StageError(index)
+
+    thread, outcome = run_in_thread(
+        run_pipeline,
+        items(),
+        convert,
+        write,
+        convert_workers=CONVERT_WORKERS,
+        queue_size=QUEUE_SIZE,
+    )
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert isinstance(outcome.get("error"), StageError)
+    assert outcome["error"].args == (20,)
+    # The other stages stop soon after, instead of draining the items
+    assert calls["convert"] <= 20 + IN_FLIGHT + 1
+    assert calls["write"] <= 21
+    before = dict(calls)
+    time.sleep(0.3)
+    assert calls == before
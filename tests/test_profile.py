@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+
+from fbutil.profile import (
+    StaleProfileError,
+    fingerprint,
+    load_profile,
+    load_profiles,
+    save_profile,
+)
+from fbutil.tools import fbinfo
+
+SYSFS = {
+    "bits_per_pixel": "32",
+    "virtual_size": "1080,4800",
+    "stride": "4352",
+    "mode": "U:1080x2400p-60",
+    "fb_location": "/dev/graphics/fb0",
+}
+
+
+def profile(serial, values=SYSFS):
+    return {"serial": serial, "fingerprint": fingerprint(values), "width": 1080}
+
+
+def test_profiles_are_looked_up_by_serial(tmp_path, monkeypatch):
+    path = str(tmp_path / "profiles.json")
+    save_profile(profile("A1"), path)
+    assert load_profile(path)["serial"] == "A1"
+    save_profile(profile("B2"), path)
+    assert load_profile(path, "B2")["serial"] == "B2"
+    # Only the saved ro.serialno names a profile, not the adb transport serial
+    monkeypatch.setenv("ANDROID_SERIAL", "192.168.1.5:5555")
+    with pytest.raises(ValueError, match="pick one"):
+        load_profile(path)
+    with pytest.raises(ValueError, match="No profile for device"):
+        load_profile(path, "C3")
+
+
+def test_stale_fingerprint_is_refused(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    save_profile(profile("A1"), path)
+    assert load_profile(path, "A1", fingerprint(SYSFS))["serial"] == "A1"
+    changed = dict(SYSFS, mode="U:720x1600p-60")
+    with pytest.raises(StaleProfileError):
+        load_profile(path, "A1", fingerprint(changed))
+
+
+def sections(values):
+    return {
+        "serial": "A1",
+        "proc_fb": "0 mdssfb_80000",
+        "wm_size": "Physical size: 1080x2400",
+        **values,
+    }
+
+
+def test_fbinfo_replaces_a_stale_profile(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path / "profiles.json")
+    probed = [sections(SYSFS), sections(SYSFS), sections(dict(SYSFS, stride="4320"))]
+    monkeypatch.setattr(fbinfo, "probe_device", lambda local=False: probed.pop(0))
+
+    with caplog.at_level(logging.WARNING):
+        fbinfo.main(["--profile-path", path])
+        fbinfo.main(["--profile-path", path])
+        assert "stale" not in caplog.text
+        fbinfo.main(["--profile-path", path])
+    assert "The profile of A1 is stale" in caplog.text
+    saved = load_profiles(path)["A1"]
+    assert saved["stride"] == 4320
+    assert saved["fingerprint"] == fingerprint(dict(SYSFS, stride="4320"))
@@ -0,0 +1,51 @@
+import subprocess
+
+import pytest
+
+from fbutil.session import ShellSession
+
+
+@pytest.fixture
+def session():
+    with ShellSession(["sh"], timeout=5) as session:
+        yield session
+
+
+def test_output_is_framed_per_command(session):
+    result = session.run("echo out; echo err >&2")
+    assert (result.stdout, result.stderr) == ("out\n", "err\n")
+    # Output without a trailing newline and empty output stay intact
+    assert session.run("printf abc").stdout == "abc"
+    assert session.run("true").stdout == ""
+    assert session.run("printf 'a\\n\\nb\\n\\n'").stdout == "a\n\nb\n\n"
+
+
+def test_state_persists_between_commands(session):
+    session.run("x=42; cd /")
+    assert session.run('echo "$x $PWD"').stdout == "42 /\n"
+
+
+def test_exit_status(session):
+    assert session.run("true").returncode == 0
+    assert session.run("false").returncode == 1
+    assert session.run("sh -c 'exit 7'").returncode == 7
+
+
+def test_exit_restarts_the_session(session):
+    assert session.run("exit 3").returncode == 3
+    result = session.run("echo again")
+    assert (result.returncode, result.stdout) == (0, "again\n")
+
+
+def test_commands_reading_stdin_do_not_hang(session):
+    result = session.run('read x; echo "[$x]"', timeout=2)
+    assert (result.returncode, result.stdout) == (0, "[]\n")
+    assert session.run("cat", timeout=2).stdout == ""
+    assert session.run("echo still here").stdout == "still here\n"
+
+
+def test_timeout_restarts_the_session(session):
+    with pytest.raises(subprocess.TimeoutExpired):
+        session.run("sleep 5", timeout=0.2)
+    assert not session.alive()
+    assert session.run("echo back").stdout == "back\n"
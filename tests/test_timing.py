@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+from fbutil.timing import Stats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_byte_counters_get_rates():
+    stats = Stats()
+    stats.enable()
+    stats.count("frames", 3)
+    stats.count("bytes_written", 2_000_000)
+    stats.count("bytes_pushed", 1_000_000)
+    stats.count("files_pushed", 2)
+    rates = stats.report()["rates"]
+    assert set(rates) == {
+        "frames_per_s",
+        "bytes_written_mb_per_s",
+        "bytes_pushed_mb_per_s",
+    }
+    assert rates["bytes_written_mb_per_s"] == 2 * rates["bytes_pushed_mb_per_s"]
+
+
+def test_img2fb_stats_json_reports_write_rate(tmp_path):
+    image_path = tmp_path / "in.png"
+    Image.fromarray(np.zeros((16, 32, 3), dtype=np.uint8)).save(image_path)
+    json_path = tmp_path / "stats.json"
+    subprocess.run(
+        [sys.executable, "-m", "fbutil", "img2fb", str(image_path)]
+        + [str(tmp_path / "out.bin"), "32", "16", "--stats-json", str(json_path)],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+    )
+    with open(json_path) as f:
+        report = json.load(f)
+    assert report["counters"]["bytes_written"] == 32 * 16 * 2
+    assert report["rates"]["bytes_written_mb_per_s"] > 0
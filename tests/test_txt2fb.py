@@ -0,0 +1,36 @@
+import functools
+
+import numpy as np
+import pytest
+
+from fbutil import glyphs
+from fbutil.tools import txt2fb
+
+WIDTH, HEIGHT = 96, 40
+TEXT = "Hello, fb!\n42%"
+
+
+@pytest.fixture(autouse=True)
+def no_atlas_cache(monkeypatch):
+    # Keep the glyph atlases out of the home directory
+    monkeypatch.setattr(
+        txt2fb, "load_atlas", functools.partial(glyphs.load_atlas, cache_dir=None)
+    )
+
+
+@pytest.mark.parametrize("format", ["RGB565", "RGB888", "RGBA8888", "ARGB8888"])
+def test_in_place_matches_full_render(tmp_path, format):
+    full_path = tmp_path / "full.bin"
+    in_place_path = tmp_path / "in_place.bin"
+    txt2fb.text_to_framebuffer(
+        TEXT, str(full_path), WIDTH, HEIGHT, format=format, text_x=5, text_y=3
+    )
+    with txt2fb.TextOverlay(
+        str(in_place_path), WIDTH, HEIGHT, format=format
+    ) as overlay:
+        overlay.draw("something else", 20, 10)
+        overlay.draw(TEXT, 5, 3)
+
+    full = np.fromfile(full_path, dtype=np.uint8)
+    assert full.any()
+    np.testing.assert_array_equal(np.fromfile(in_place_path, dtype=np.uint8), full)
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from fbutil.container import FrameContainer
+from fbutil.tools.vid2fb import video_to_framebuffer
+
+WIDTH, HEIGHT = 64, 48
+
+
+@pytest.fixture
+def repeating_video(make_video):
+    # Runs of identical frames, and a frame that comes back later
+    rng = np.random.default_rng(3)
+    a, b, c = (rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8) for _ in "abc")
+    return make_video([a, a, a, b, b, c, a, a])
+
+
+def read_frames(path):
+    with FrameContainer(path) as container:
+        return [container.render(i).copy() for i in range(len(container))]
+
+
+@pytest.mark.parametrize("processes", [None, 2])
+def test_cached_container_shares_repeated_frames(tmp_path, repeating_video, processes):
+    cache_dir = str(tmp_path / "cache")
+    plain = str(tmp_path / "plain.fbc")
+    video_to_framebuffer(repeating_video, plain, WIDTH, HEIGHT, container=True)
+    expected = read_frames(plain)
+    assert len(expected) == 8
+
+    # The first run fills the cache, the second loads the frames from it
+    for name in ("miss.fbc", "hit.fbc"):
+        path = str(tmp_path / name)
+        video_to_framebuffer(
+            repeating_video,
+            path,
+            WIDTH,
+            HEIGHT,
+            container=True,
+            cache_dir=cache_dir,
+            processes=processes,
+        )
+        # Three distinct frames are stored instead of eight
+        assert os.path.getsize(path) < os.path.getsize(plain) / 2
+        frames = read_frames(path)
+        assert len(frames) == len(expected)
+        for frame, want in zip(frames, expected):
+            np.testing.assert_array_equal(frame, want)
+        with FrameContainer(path) as container:
+            offsets = [int(offset) for offset, _ in container.index]
+        assert offsets[0] == offsets[1] == offsets[2] == offsets[6] == offsets[7]
+        assert offsets[3] == offsets[4]
+        assert len(set(offsets)) == 3
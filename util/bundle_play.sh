@@ -0,0 +1,36 @@
+#!/bin/bash
+if [ "$EUID" -ne 0 ]
+  then echo "Please run as root"
+  exit
+fi
+
+# Prompt for framebuffer device
+echo "Enter the path to the framebuffer device (e.g., /dev/graphics/fb0):"
+read framebuffer_device
+
+# Prompt for the .gz bundle made by vid2fb --bundle or fbbundle
+echo "Enter the path to the .gz bundle (e.g., /sdcard/video.gz):"
+read bundle
+
+# Check if the framebuffer device exists
+if [ ! -e "$framebuffer_device" ]; then
+    echo "Error: Framebuffer device $framebuffer_device does not exist."
+    exit 1
+fi
+
+# Check if the bundle and its index exist
+if [ ! -e "$bundle" ] || [ ! -e "$bundle.idx" ]; then
+    echo "Error: Bundle $bundle or its index $bundle.idx does not exist."
+    exit 1
+fi
+
+# Every line of the index is "offset length first_frame frames" for one gzip
+# chunk. Each chunk is cut out of the bundle and decompressed straight into the
+# framebuffer, so nothing is unpacked to storage. Bundles must be made with
+# --chunk-frames 1 (the default) for every chunk to hold a single frame.
+while true; do
+    grep -v '^#' "$bundle.idx" | while read offset length first_frame frames; do
+        tail -c +$((offset + 1)) "$bundle" | head -c "$length" | gzip -dc > "$framebuffer_device"
+    done
+    echo "End of bundle. Looping"
+done